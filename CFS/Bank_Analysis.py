@@ -3,23 +3,16 @@ import pandas as pd
 from datetime import datetime, timedelta, date
 import warnings
 
+from cfs_engine.Export import iter_chunks
+from .Data_Source import get_bank_limits, load_dataset
+from .Export import export_buttons
+
 warnings.filterwarnings('ignore')
 
 # =============================================================================
 # CONFIGURATION & COMMON FUNCTIONS (Included in each file)
 # =============================================================================
-FILE_PATH = r"C:\Users\hp\OneDrive\Desktop\Oriana\Cash flow\OPL CFS.xlsx"
 CRORE_CONVERSION = 10000000
-BANK_LIMITS = {
-    'SBI': 69000000,
-    'ICICI': 100000000,
-    'HDFC': 100000000,
-    'Federal': 150000000,
-    'Axis': 5000000,
-    'Yes': 50000000
-}
-POSITIVE_BALANCE_BANKS = ['SBI', 'ICICI', 'HDFC', 'Yes']
-NEGATIVE_BALANCE_BANKS = ['Federal', 'Axis']
 
 BG_PRIMARY = '#0f172a'
 BG_SECONDARY = '#1e293b'
@@ -43,41 +36,6 @@ def get_base_styles():
     </style>
     """
 
-@st.cache_data(ttl=300)
-def load_excel_data():
-    try:
-        xls = pd.ExcelFile(FILE_PATH)
-        bank_data = {}
-        bank_name_mapping = {'sbi': 'SBI', 'icici': 'ICICI', 'hdfc': 'HDFC', 'federal': 'Federal', 'axis': 'Axis', 'yes': 'Yes', 'yes bank': 'Yes'}
-        for sheet in xls.sheet_names:
-            df, sheet_lower = pd.read_excel(xls, sheet_name=sheet), sheet.lower()
-            if 'forecast' not in sheet_lower:
-                bank_name = next((val for key, val in bank_name_mapping.items() if key in sheet_lower), None)
-                if bank_name:
-                    try:
-                        bank_data[bank_name] = pd.DataFrame({'Value_Date': pd.to_datetime(df.iloc[:, 2], errors='coerce'), 'Running_Balance': pd.to_numeric(df.iloc[:, 9], errors='coerce')}).dropna(subset=['Value_Date'])
-                    except Exception: pass
-        return bank_data
-    except Exception as e:
-        st.error(f"Error loading Excel file: {e}")
-        return {}
-
-def get_balance_on_date(bank_data, bank_name, target_date):
-    if bank_name not in bank_data or bank_data[bank_name].empty: return 0
-    df_filtered = bank_data[bank_name][bank_data[bank_name]['Value_Date'] <= target_date]
-    if df_filtered.empty: return 0
-    return df_filtered.sort_values('Value_Date')['Running_Balance'].iloc[-1]
-
-def get_bank_balances(bank_data, as_of_date):
-    bank_balances = {}
-    for bank, limit in BANK_LIMITS.items():
-        balance = get_balance_on_date(bank_data, bank, as_of_date)
-        used = -balance if bank in POSITIVE_BALANCE_BANKS else balance
-        available = (limit + balance) if bank in POSITIVE_BALANCE_BANKS else (limit - balance)
-        utilization = (abs(used) / limit * 100) if limit > 0 else 0
-        bank_balances[bank] = {'limit': limit, 'used': used, 'available': available, 'utilization': utilization}
-    return bank_balances
-
 # =============================================================================
 # MAIN APP LOGIC
 # =============================================================================
@@ -85,24 +43,26 @@ def app():
     st.markdown(get_base_styles(), unsafe_allow_html=True)
     st.markdown("<div class='main-header'><h1>🏦 Bank Analysis</h1></div>", unsafe_allow_html=True)
 
-    bank_data = load_excel_data()
+    dataset = load_dataset()
+    bank_data = dataset.bank_data
     if not bank_data: return
 
-    all_dates = [d for df in bank_data.values() for d in df['Value_Date'].dropna()]
-    if not all_dates:
+    min_date, max_date = dataset.date_bounds()
+    if min_date is None:
         st.error("No valid dates found in data.")
         return
 
-    min_date, max_date = min(all_dates).date(), max(all_dates).date()
     end_date_dt = st.date_input("Select 'As Of' Date", value=max_date, min_value=min_date, max_value=max_date, key="bank_asof_date")
     
-    bank_balances = get_bank_balances(bank_data, pd.Timestamp(end_date_dt))
+    bank_balances = get_bank_limits(dataset, pd.Timestamp(end_date_dt))
 
     st.markdown("### Bank-wise Limit Details")
     st.markdown('<div class="table-container">', unsafe_allow_html=True)
-    bank_details = [{"Bank": bank, "Limit (Cr)": data['limit']/CRORE_CONVERSION, "Used (Cr)": data['used']/CRORE_CONVERSION, "Available (Cr)": data['available']/CRORE_CONVERSION, "Utilization (%)": f"{data['utilization']:.2f}%"} for bank, data in bank_balances.items()]
-    st.dataframe(pd.DataFrame(bank_details), use_container_width=True, hide_index=True)
+    bank_details = [{"Bank": bank, "Limit (Cr)": data.limit/CRORE_CONVERSION, "Used (Cr)": data.used/CRORE_CONVERSION, "Available (Cr)": data.available/CRORE_CONVERSION, "Utilization (%)": f"{data.utilization:.2f}%"} for bank, data in bank_balances.items()]
+    bank_details = pd.DataFrame(bank_details)
+    st.dataframe(bank_details, use_container_width=True, hide_index=True)
     st.markdown('</div>', unsafe_allow_html=True)
+    export_buttons(lambda: iter_chunks(bank_details), f"bank_limits_{end_date_dt:%Y%m%d}", key="bank_export")
 
     st.markdown(f"""<div class="copyright">© {datetime.now().year} Cash Flow Analytics</div>""", unsafe_allow_html=True)
 
@@ -1,38 +1,74 @@
+import importlib
+import time
 import streamlit as st
 
 # =============================================================================
-# CORRECTED RELATIVE IMPORTS
+# VIEWS
 # =============================================================================
-# The dot (.) tells Python to look for these modules in the CURRENT FOLDER
-# (the 'CFS' folder). This is the critical fix.
-from . import Overview
-from . import Variance_Analysis
-from . import Trend_Analysis
-from . import Bank_Analysis
-from . import Transaction_details
+# Tab label -> module in this folder (the 'CFS' folder). With LAZY_VIEWS a module is
+# only imported, with a relative import, the first time its tab is opened.
+VIEWS = {
+    "Overview": "Overview",
+    "Variance Analysis": "Variance_Analysis",
+    "Trend Analysis": "Trend_Analysis",
+    "Bank Analysis": "Bank_Analysis",
+    "Transaction Details": "Transaction_details",
+}
+# True: a rerun only executes the selected tab. False: every tab runs on every rerun.
+LAZY_VIEWS = True
+# Prefix of each view's widget keys. Hidden views render no widgets, so their selections
+# are carried over in session state until the view is opened again.
+VIEW_STATE_PREFIXES = {
+    "Overview": "ov_",
+    "Variance Analysis": "fs_",
+    "Trend Analysis": "ta_",
+    "Bank Analysis": "bank_",
+    "Transaction Details": "td_",
+}
+# Shows how long the last rerun of the dashboard took, and the figure cache hit rate, under the tabs.
+SHOW_RERUN_TIME = False
+
+
+def load_view(label):
+    """Imports the module behind a tab on first use; later calls return the loaded module."""
+    return importlib.import_module(f".{VIEWS[label]}", __package__)
+
+def keep_view_state(hidden_labels):
+    """
+    Re-assigns the widget values of hidden views so Streamlit does not drop them at the end
+    of the run. Only hidden views are touched: the open view's widgets keep their own state.
+    """
+    prefixes = tuple(VIEW_STATE_PREFIXES[label] for label in hidden_labels)
+    for key in list(st.session_state.keys()):
+        if isinstance(key, str) and key.startswith(prefixes):
+            st.session_state[key] = st.session_state[key]
 
 
 def main():
+    started = time.perf_counter()
     st.title("CFS Dashboard")
 
-    tabs = st.tabs([
-        "Overview",
-        "Variance Analysis",
-        "Trend Analysis",
-        "Bank Analysis",
-        "Transaction Details",
-    ])
-
-    with tabs[0]:
-        Overview.app()
-    with tabs[1]:
-        Variance_Analysis.app()
-    with tabs[2]:
-        Trend_Analysis.app()
-    with tabs[3]:
-        Bank_Analysis.app()
-    with tabs[4]:
-        Transaction_details.app()
+    if LAZY_VIEWS:
+        tabs = st.tabs(list(VIEWS), key="cfs_view", on_change="rerun")
+        hidden = []
+        for label, tab in zip(VIEWS, tabs):
+            if not tab.open:
+                hidden.append(label)
+                continue
+            with tab:
+                load_view(label).app()
+        keep_view_state(hidden)
+    else:
+        tabs = st.tabs(list(VIEWS))
+        for label, tab in zip(VIEWS, tabs):
+            with tab:
+                load_view(label).app()
+
+    st.session_state['cfs_rerun_seconds'] = time.perf_counter() - started
+    if SHOW_RERUN_TIME:
+        from .Figure_Cache import get_figure_cache
+        figures = get_figure_cache().stats()
+        st.caption(f"Rendered in {st.session_state['cfs_rerun_seconds'] * 1000:.0f} ms · figure cache {figures['hits']} hits / {figures['misses']} misses")
 
 def app():
     main()
@@ -41,4 +77,3 @@ def app():
 # but more importantly, it works correctly when imported by app.py
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+# (longest span in days, pandas period, label): the first row whose span fits the
+# visible range sets the chart resolution. Flows are summed per bucket, so the number
+# of bars and points grows with the span only until the next, coarser row takes over.
+CHART_RESOLUTIONS = [
+    (93, 'D', 'Daily'),
+    (731, 'W', 'Weekly'),
+    (3653, 'M', 'Monthly'),
+    (None, 'Q', 'Quarterly'),
+]
+# Line series longer than this are reduced with LTTB (largest triangle three buckets),
+# which keeps peaks and troughs instead of averaging them away.
+CHART_MAX_LINE_POINTS = 1000
+# Line traces with more points than this are drawn with WebGL (go.Scattergl) instead of SVG.
+SCATTERGL_MIN_POINTS = 400
+
+
+# =============================================================================
+# RESOLUTION
+# =============================================================================
+def pick_resolution(start_date, end_date):
+    """(period, label) of the CHART_RESOLUTIONS row for the start_date..end_date span."""
+    span = (pd.Timestamp(end_date) - pd.Timestamp(start_date)).days + 1
+    for max_days, period, label in CHART_RESOLUTIONS:
+        if max_days is None or span <= max_days:
+            return period, label
+
+def resample_sum(data, period):
+    """
+    Sums a date-indexed Series or DataFrame per `period` bucket, labelled with the bucket's
+    first day. Only buckets that have rows are returned; daily data is returned unchanged.
+    """
+    if period == 'D' or data.empty:
+        return data
+    buckets = pd.DatetimeIndex(data.index).to_period(period).start_time
+    return data.groupby(buckets).sum()
+
+
+# =============================================================================
+# DOWNSAMPLING
+# =============================================================================
+def lttb_indices(x, y, threshold):
+    """
+    Positions of the points kept by Largest-Triangle-Three-Buckets when reducing (x, y) to
+    `threshold` points. The first and last points are always kept.
+    """
+    n = len(y)
+    if threshold is None or threshold >= n or threshold < 3:
+        return np.arange(n)
+    x, y = np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64')
+    edges = np.linspace(1, n - 1, threshold - 1).astype('int64')
+    kept = np.empty(threshold, dtype='int64')
+    kept[0], kept[-1], a = 0, n - 1, 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+def downsample_line(series, max_points=CHART_MAX_LINE_POINTS):
+    """A date-indexed Series reduced to at most `max_points` points with LTTB."""
+    if len(series) <= (max_points or len(series)):
+        return series
+    x = pd.DatetimeIndex(series.index).asi8
+    return series.iloc[lttb_indices(x, series.to_numpy(), max_points)]
+
+
+# =============================================================================
+# TRACES
+# =============================================================================
+def line_trace(series, **kwargs):
+    """
+    Scatter trace for a date-indexed Series: downsampled with LTTB and drawn with WebGL
+    past SCATTERGL_MIN_POINTS points.
+    """
+    series = downsample_line(series)
+    trace = go.Scattergl if len(series) > SCATTERGL_MIN_POINTS else go.Scatter
+    return trace(x=series.index, y=series.to_numpy(), **kwargs)
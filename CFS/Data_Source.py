@@ -0,0 +1,112 @@
+import streamlit as st
+
+from cfs_engine.Daily_Close import daily_close_version, read_daily_close
+from cfs_engine.Data_Ingestion import FILE_PATH, CFSDataset
+from cfs_engine.Entities import CONSOLIDATED, ENTITIES, consolidate, entity_names, load_entity, prepare_snapshots
+from cfs_engine.File_Watcher import WorkbookWatcher
+from cfs_engine.KPIs import get_bank_balances, get_period_kpis as compute_period_kpis
+
+# =============================================================================
+# STREAMLIT DATA SOURCE
+# =============================================================================
+# The CFS tabs get their data here: the parsing, indexes and KPIs live in cfs_engine,
+# this module only adds the per-process caching and error display the dashboard needs.
+
+# Session state key of the sidebar entity selector.
+ENTITY_KEY = "entity"
+
+def _prebuild_snapshot(file_path, version):
+    """Watcher listener: refreshes the Parquet snapshot as soon as a change settles, before anyone asks for it."""
+    from cfs_engine.Snapshot import load_or_build_snapshot
+    # P&L workbooks are watched too (see PnL_Analysis.load_financial_data) but have no snapshot.
+    if file_path in {paths['cfs'] for paths in ENTITIES.values()}:
+        load_or_build_snapshot(file_path)
+
+@st.cache_resource(show_spinner=False)
+def get_watcher():
+    """One workbook watcher per server process."""
+    watcher = WorkbookWatcher()
+    watcher.on_change(_prebuild_snapshot)
+    return watcher.start()
+
+def get_data_version(file_path=FILE_PATH):
+    """
+    Version token of a workbook's data (a CFS or P&L workbook; the first call starts watching it).
+    It changes only when the file has actually changed and the write has settled, so downstream
+    caches can use it as a key.
+    """
+    return get_watcher().version(file_path)
+
+def get_entity():
+    """Entity picked in the sidebar selector (see app.py); the first registered one by default."""
+    return st.session_state.get(ENTITY_KEY, entity_names()[0])
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _load_entity_cached(entity, version):
+    """One frozen dataset per entity and workbook version, shared by reference with every session (no per-call copies)."""
+    return load_entity(entity)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _consolidate_cached(data_tokens, _datasets):
+    """One consolidated view per set of entity versions; `_datasets` are the cached entity datasets."""
+    return consolidate(_datasets)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _prepare_snapshots_cached(versions):
+    """Brings every entity's snapshot up to date once per set of workbook versions, not on every rerun."""
+    return prepare_snapshots([ENTITIES[entity]['cfs'] for entity in ENTITIES])
+
+def _load_consolidated():
+    versions = tuple(get_data_version(ENTITIES[entity]['cfs']) for entity in ENTITIES)
+    # Out-of-date workbooks are parsed in parallel worker processes first, so every
+    # per-entity load below reads its snapshot (or is already cached).
+    _prepare_snapshots_cached(versions)
+    datasets = {entity: _load_entity_cached(entity, version) for entity, version in zip(ENTITIES, versions)}
+    return _consolidate_cached(tuple(dataset.data_token for dataset in datasets.values()), datasets)
+
+def load_dataset(entity=None):
+    """
+    Returns the parsed dataset of `entity` (default: the selected one), or the consolidated view
+    over every entity, shared by all tabs and sessions and rebuilt only when a data version
+    changes. It is read-only: copy a frame before changing it.
+    """
+    entity = entity or get_entity()
+    try:
+        if entity == CONSOLIDATED:
+            return _load_consolidated()
+        return _load_entity_cached(entity, get_data_version(ENTITIES[entity]['cfs']))
+    except Exception as e:
+        st.error(f"Fatal error loading Excel file: {e}")
+        return CFSDataset(file_path=ENTITIES.get(entity, {}).get('cfs', "")).build_indexes()
+
+
+# =============================================================================
+# MATERIALIZED KPIs
+# =============================================================================
+# `python -m cfs_engine.Daily_Close` stores the KPIs of every day for the default period
+# (first ledger day..day). Those views read the stored row; other ranges are computed live.
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _load_daily_close_cached(file_path, data_token, close_version, bank_limits):
+    return read_daily_close(file_path, data_token, bank_limits=bank_limits)
+
+def get_daily_close(dataset):
+    """The materialized KPIs of this workbook version, or None when the job has not run for it (or for the consolidated view)."""
+    if not dataset.data_token or not dataset.file_path:
+        return None
+    try:
+        bank_limits = dict(dataset.bank_limits) if dataset.bank_limits else None
+        return _load_daily_close_cached(dataset.file_path, dataset.data_token, daily_close_version(dataset.file_path), bank_limits)
+    except Exception:
+        return None
+
+def get_period_kpis(dataset, start_date, end_date):
+    """PeriodKPIs of the period: the stored row when there is one, otherwise computed live."""
+    daily_close = get_daily_close(dataset)
+    kpis = daily_close.period_kpis(start_date, end_date) if daily_close else None
+    return kpis or compute_period_kpis(dataset, start_date, end_date)
+
+def get_bank_limits(dataset, as_of_date):
+    """{bank: BankLimit} as of a date: the stored rows when there are some, otherwise computed live."""
+    daily_close = get_daily_close(dataset)
+    bank_balances = daily_close.bank_balances(as_of_date) if daily_close else None
+    return bank_balances or get_bank_balances(dataset.balances, as_of_date, dataset.bank_limits)
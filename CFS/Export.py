@@ -0,0 +1,18 @@
+import streamlit as st
+
+from cfs_engine.Export import EXPORT_FORMATS, export_file
+
+# =============================================================================
+# DOWNLOAD WIDGET
+# =============================================================================
+def export_buttons(make_chunks, file_stem, key, label="⬇️ Export"):
+    """
+    Format picker and download button. `make_chunks()` returns the chunks to export (see
+    cfs_engine.Export.iter_chunks); it is only called when the button is clicked, on a
+    separate thread, so rendering the page never builds the file. Downloading does not
+    rerun the page.
+    """
+    c1, c2 = st.columns([1, 3])
+    format_label = c1.selectbox("Export Format", list(EXPORT_FORMATS), key=f"{key}_format", label_visibility="collapsed")
+    extension, mime = EXPORT_FORMATS[format_label]
+    c2.download_button(label, data=lambda: export_file(make_chunks(), extension), file_name=f"{file_stem}.{extension}", mime=mime, key=f"{key}_download", on_click="ignore")
@@ -0,0 +1,51 @@
+import functools
+import json
+import plotly.graph_objects as go
+import streamlit as st
+
+from cfs_engine.KPI_Cache import KPICache, call_key
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+# Serialized figures kept per server process, shared by every session; the least
+# recently used are evicted first when either limit is hit.
+FIGURE_CACHE_MAX_ENTRIES = 256
+FIGURE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    """The process-wide figure cache; its stats() report hits, misses and evictions."""
+    return KPICache(FIGURE_CACHE_MAX_ENTRIES, FIGURE_CACHE_MAX_BYTES)
+
+
+# =============================================================================
+# DECORATOR
+# =============================================================================
+def cached_figure(*data_args):
+    """
+    Caches a chart builder's figure as its JSON spec, keyed like versioned_memo: (chart
+    function, data tokens of the `data_args` arguments, every other argument). A hit
+    skips building and theming the figure and re-creates it from the spec without
+    re-validating it, which is several times cheaper. Builders must only depend on their
+    arguments; callers get a new figure each time and may change it freely.
+    """
+    def decorator(func):
+        make_key = call_key(func, data_args)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            if key is None:
+                return func(*args, **kwargs)
+            cache = get_figure_cache()
+            hit, spec = cache.get(key)
+            if hit:
+                # The spec came from a valid figure, so plotly's per-property validation is skipped.
+                return go.Figure(json.loads(spec), _validate=False)
+            fig = func(*args, **kwargs)
+            cache.put(key, fig.to_json(validate=False))
+            return fig
+        return wrapper
+    return decorator
@@ -3,12 +3,17 @@ import pandas as pd
 from datetime import datetime, timedelta, date
 import warnings
 
+from cfs_engine.Data_Ingestion import to_rupees
+from cfs_engine.Export import export_transactions, iter_chunks
+from cfs_engine.Transactions import SIGN_FILTERS, SORT_COLUMNS, filter_transactions, sort_positions, summarize_transactions
+from .Data_Source import load_dataset
+from .Export import export_buttons
+
 warnings.filterwarnings('ignore')
 
 # =============================================================================
 # CONFIGURATION & COMMON FUNCTIONS (Included in each file)
 # =============================================================================
-FILE_PATH = r"C:\Users\hp\OneDrive\Desktop\Script\OPL\Base data\OPL CFS v2.xlsx"
 CRORE_CONVERSION = 10000000
 
 BG_PRIMARY = '#0f172a'
@@ -33,28 +38,22 @@ def get_base_styles():
     </style>
     """
 
-@st.cache_data(ttl=300)
-def load_excel_data():
-    try:
-        xls = pd.ExcelFile(FILE_PATH)
-        bank_data = {}
-        bank_name_mapping = {'sbi': 'SBI', 'icici': 'ICICI', 'hdfc': 'HDFC', 'federal': 'Federal', 'axis': 'Axis', 'yes': 'Yes', 'yes bank': 'Yes'}
-        for sheet in xls.sheet_names:
-            df, sheet_lower = pd.read_excel(xls, sheet_name=sheet), sheet.lower()
-            if 'forecast' not in sheet_lower:
-                bank_name = next((val for key, val in bank_name_mapping.items() if key in sheet_lower), None)
-                if bank_name:
-                    try:
-                        bank_data[bank_name] = pd.DataFrame({'Value_Date': pd.to_datetime(df.iloc[:, 2], errors='coerce'), 'Net_Flow': pd.to_numeric(df.iloc[:, 8], errors='coerce'), 'Category': df.iloc[:, 11].fillna('Unknown'), 'Remarks': df.iloc[:, 12].fillna('') if len(df.columns) > 12 else '', 'Bank': bank_name}).dropna(subset=['Value_Date', 'Net_Flow'])
-                    except Exception: pass
-        return bank_data
-    except Exception as e:
-        st.error(f"Error loading Excel file: {e}")
-        return {}
-
-def consolidate_bank_data(bank_data, start_date, end_date):
-    if not bank_data: return pd.DataFrame()
-    return pd.concat(list(bank_data.values())).query("@start_date <= Value_Date <= @end_date")
+# =============================================================================
+# SERVER-SIDE GRID
+# =============================================================================
+# The grid filters, sorts and pages on the server: only the visible page is formatted and sent to the browser.
+PAGE_SIZES = [25, 50, 100, 250]
+
+def get_page(transactions, positions, page, page_size):
+    """Formats only the rows of one page for display."""
+    rows = transactions.iloc[positions[(page - 1) * page_size:page * page_size]]
+    return pd.DataFrame({
+        'Value_Date': rows['Value_Date'].dt.strftime('%Y-%m-%d'),
+        'Bank': rows['Bank'].astype(str),
+        'Category': rows['Category'].astype(str),
+        'Net_Flow (Cr)': (to_rupees(rows['Net_Flow']) / CRORE_CONVERSION).round(2),
+        'Remarks': rows['Remarks'],
+    })
 
 # =============================================================================
 # MAIN APP LOGIC
@@ -63,27 +62,64 @@ def app():
     st.markdown(get_base_styles(), unsafe_allow_html=True)
     st.markdown("<div class='main-header'><h1>📋 Transaction Details</h1></div>", unsafe_allow_html=True)
 
-    bank_data = load_excel_data()
-    if not bank_data: return
+    dataset = load_dataset()
+    ledger = dataset.ledger
+    if ledger is None:
+        # The consolidated view only sums the entities' aggregates; it has no transaction rows.
+        st.info("Transactions are listed per entity. Pick an entity in the sidebar to browse them.")
+        return
+    if not dataset.bank_data: return
 
-    all_dates = [d for df in bank_data.values() for d in df['Value_Date'].dropna()]
-    if not all_dates:
+    min_date, max_date = ledger.date_bounds()
+    if min_date is None:
         st.error("No valid dates found in data.")
         return
 
-    min_date, max_date = min(all_dates).date(), max(all_dates).date()
     c1, c2 = st.columns(2)
     start_date_dt = c1.date_input("From Date", value=min_date, min_value=min_date, max_value=max_date, key="td_from_date")
     end_date_dt = c2.date_input("To Date", value=max_date, min_value=start_date_dt, max_value=max_date, key="td_to_date")
 
-    consolidated_data = consolidate_bank_data(bank_data, pd.Timestamp(start_date_dt), pd.Timestamp(end_date_dt))
+    consolidated_data = ledger.between(pd.Timestamp(start_date_dt), pd.Timestamp(end_date_dt))
     
     if not consolidated_data.empty:
+        search = st.text_input("Search Remarks / Category", placeholder="e.g. security inv", key="td_search")
+        # Words are matched as prefixes in the text index built at ingestion, not by scanning the rows.
+        matches = dataset.text_index.search(search, start_date_dt, end_date_dt) if search.strip() else None
+
+        f1, f2, f3, f4, f5 = st.columns([2, 2, 1, 1, 2])
+        banks = f1.multiselect("Bank", list(ledger.bank_offsets), key="td_banks")
+        categories = f2.multiselect("Category", sorted(ledger.frame['Category'].cat.categories.astype(str)), key="td_categories")
+        min_amount = f3.number_input("Min Amount (Cr)", min_value=0.0, value=None, step=0.1, key="td_min_amount")
+        max_amount = f4.number_input("Max Amount (Cr)", min_value=0.0, value=None, step=0.1, key="td_max_amount")
+        sign = f5.radio("Type", SIGN_FILTERS, horizontal=True, key="td_sign")
+
+        positions = filter_transactions(consolidated_data, banks, categories, min_amount, max_amount, sign, rows=matches)
+        summary = summarize_transactions(consolidated_data, positions)
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Transactions", f"{summary.count:,}")
+        m2.metric("Inflow", f"₹{summary.inflow:.2f} Cr")
+        m3.metric("Outflow", f"₹{summary.outflow:.2f} Cr")
+        m4.metric("Net Flow", f"₹{summary.net_flow:.2f} Cr")
+
+        s1, s2, s3, s4 = st.columns([2, 1, 1, 1])
+        sort_by = s1.selectbox("Sort By", list(SORT_COLUMNS), key="td_sort_by")
+        descending = s2.toggle("Descending", key="td_sort_desc")
+        page_size = s3.selectbox("Rows per Page", PAGE_SIZES, key="td_page_size")
+        pages = max(1, -(-len(positions) // page_size))
+        if st.session_state.get("td_page", 1) > pages:
+            st.session_state["td_page"] = pages
+        page = s4.number_input("Page", min_value=1, max_value=pages, step=1, key="td_page")
+        s4.caption(f"of {pages:,}")
+
+        # Rows already come in date order, so the default sort needs no work.
+        if sort_by != 'Date' or descending:
+            positions = sort_positions(consolidated_data, positions, SORT_COLUMNS[sort_by], descending)
+
+        # Exports every filtered row in the on-screen order, not just the visible page.
+        export_buttons(lambda: iter_chunks(consolidated_data, positions, convert=export_transactions), f"transactions_{start_date_dt:%Y%m%d}_{end_date_dt:%Y%m%d}", key="td_export")
+
         st.markdown('<div class="table-container">', unsafe_allow_html=True)
-        transactions = consolidated_data[['Value_Date', 'Bank', 'Category', 'Net_Flow', 'Remarks']].copy()
-        transactions['Net_Flow (Cr)'] = (transactions['Net_Flow'] / CRORE_CONVERSION).round(2)
-        transactions['Value_Date'] = transactions['Value_Date'].dt.strftime('%Y-%m-%d')
-        st.dataframe(transactions[['Value_Date', 'Bank', 'Category', 'Net_Flow (Cr)', 'Remarks']], use_container_width=True, hide_index=True)
+        st.dataframe(get_page(consolidated_data, positions, page, page_size), use_container_width=True, hide_index=True)
         st.markdown('</div>', unsafe_allow_html=True)
     else:
         st.info("📭 No transactions found for the selected date range.")
@@ -1,22 +1,20 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime
 import warnings
 
+from CFS.Data_Source import get_data_version, get_entity
+from CFS.Figure_Cache import cached_figure
+from cfs_engine.Entities import CONSOLIDATED, ENTITIES
+from cfs_engine.PnL import PL_FILE_PATH, PL_ITEMS, consolidate_pl_data, get_pl_ratios, load_pl_sheet, process_pl_data
+
 warnings.filterwarnings('ignore')
 
 # =============================================================================
 # CONFIGURATION & SETUP
 # =============================================================================
-FILE_PATH = r"C:\Users\hp\OneDrive\Desktop\Script\OPL\Base data\OPL FS Consolidate 0725.xlsx"
-CRORE_CONVERSION = 10000000
-
-PL_ITEMS = [
-    'Revenue', 'Operating expense', 'Admin & Overheads', 'Employee Cost',
-    'Other cost', 'EBITDA', 'Finance Costs', 'PAT'
-]
+FILE_PATH = PL_FILE_PATH
 
 # --- Theme & Colors ---
 BG_PRIMARY = '#0f172a'
@@ -44,67 +42,38 @@ COLOR_MAP = {
 # =============================================================================
 # DATA LOADING & PROCESSING
 # =============================================================================
-@st.cache_data(ttl=300)
-def load_financial_data():
-    """Loads only the P&L sheet from the specified Excel file."""
-    try:
-        pl_df = pd.read_excel(FILE_PATH, sheet_name='P&L')
-        pl_df.columns = [str(col).strip().lower() for col in pl_df.columns]
-        return {'P&L': pl_df}
-    except Exception as e:
-        st.error(f"Error loading P&L data from '{FILE_PATH}': {e}")
-        return {}
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _load_pl_sheet_cached(file_path, version):
+    """One P&L sheet per workbook version, re-read only when the workbook watcher sees the file change."""
+    return load_pl_sheet(file_path)
 
-def process_pl_data(pl_df):
+def load_financial_data(file_path=FILE_PATH):
+    """Loads only the P&L sheet from the specified Excel file; errors are raised (see load_entity_pl)."""
+    return {'P&L': _load_pl_sheet_cached(file_path, get_data_version(file_path))}
+
+def load_entity_pl(entity):
     """
-    Processes the P&L DataFrame to extract monthly and YTD data.
-    Now fetches data from columns C to N (skipping B and O).
+    PLData of the entity's workbook, or of every entity's (with a 'pnl' workbook) summed for the
+    consolidated view. None when there is none or any workbook fails to load or process (the
+    error is shown), so a consolidated total never silently leaves an entity out.
     """
-    if pl_df is None or pl_df.empty:
-        return {}, {}
+    entities = [name for name in ENTITIES if ENTITIES[name].get('pnl')] if entity == CONSOLIDATED else [entity]
     try:
-        statement_col = pl_df.columns[0]
-        
-        # Get all columns except the first statement column
-        all_data_cols = pl_df.columns[1:]
-        
-        # Filter out YTD columns
-        non_ytd_cols = [col for col in all_data_cols if 'ytd' not in col.lower()]
-        
-        # Skip the first month column (index 0, which is column B) and take the next 12 months (C to N)
-        # This gets columns at indices 1-12 from non_ytd_cols, which corresponds to C-N in Excel
-        month_cols = non_ytd_cols[1:13] if len(non_ytd_cols) > 1 else []
-        
-        # Get YTD column (column O)
-        ytd_col = next((col for col in pl_df.columns if 'ytd' in col.lower()), None)
-        
-        pl_data = {}
-        ytd_data = {}
-        
-        for item in PL_ITEMS:
-            matching_rows = pl_df[pl_df[statement_col].astype(str).str.contains(item, case=False, na=False)]
-            
-            if not matching_rows.empty:
-                row = matching_rows.iloc[0]
-                monthly_values = [pd.to_numeric(row.get(col, 0), errors='coerce') / CRORE_CONVERSION for col in month_cols]
-                pl_data[item] = {
-                    'months': [col.replace('-', ' ').title() for col in month_cols], 
-                    'values': [v if pd.notna(v) else 0 for v in monthly_values]
-                }
-                
-                if ytd_col and ytd_col in row:
-                    ytd_val = pd.to_numeric(row[ytd_col], errors='coerce')
-                    ytd_data[item] = ytd_val / CRORE_CONVERSION if pd.notna(ytd_val) else 0
-                else:
-                    ytd_data[item] = sum(pl_data[item]['values'])
-            else:
-                pass
-                
+        pls = []
+        for name in entities:
+            file_path = ENTITIES[name].get('pnl', FILE_PATH)
+            try:
+                pl_df = load_financial_data(file_path)['P&L']
+            except Exception as e:
+                st.error(f"Error loading P&L data from '{file_path}': {e}")
+                return None
+            pls.append(process_pl_data(pl_df))
+        if not pls:
+            return None
+        return pls[0] if len(pls) == 1 else consolidate_pl_data(pls)
     except Exception as e:
         st.error(f"An error occurred while processing P&L data: {e}")
-        return {}, {}
-        
-    return pl_data, ytd_data
+        return None
 
 # =============================================================================
 # UI & CHARTING FUNCTIONS
@@ -117,6 +86,7 @@ def create_metric_card(label, value, delta=None, value_color="neutral", prefix="
     
     return f"""<div class="metric-card"><div class="metric-label">{label}</div><div class="{value_class}">{display_value}</div>{delta_html}</div>"""
 
+@cached_figure()
 def create_pl_trend_chart(pl_data):
     """Creates the main P&L trend chart."""
     if not pl_data:
@@ -166,13 +136,13 @@ def app():
     st.markdown("### YTD Performance")
     
     with st.spinner('Loading P&L data...'):
-        financial_data = load_financial_data()
+        pl = load_entity_pl(get_entity())
     
-    if not financial_data or 'P&L' not in financial_data:
+    if pl is None:
         st.error("❌ Could not load P&L data. Please verify the 'P&L' sheet exists in the Excel file.")
         return
         
-    pl_data, ytd_data = process_pl_data(financial_data.get('P&L'))
+    pl_data, ytd_data = pl.monthly, pl.ytd
     
     if ytd_data:
         cols = st.columns(4)
@@ -195,19 +165,16 @@ def app():
         st.plotly_chart(pl_chart, use_container_width=True, config={'displayModeBar': False})
         st.markdown('</div>', unsafe_allow_html=True)
         
-        if ytd_data.get('Revenue', 0) > 0:
+        ratios = get_pl_ratios(ytd_data)
+        if ratios:
             st.markdown("### Key Ratios (YTD)")
             col1, col2, col3 = st.columns(3)
             with col1:
-                margin = (ytd_data.get('EBITDA', 0) / ytd_data['Revenue']) * 100
-                st.markdown(create_metric_card("EBITDA Margin", margin, value_color="positive" if margin > 0 else "negative", suffix="%"), unsafe_allow_html=True)
+                st.markdown(create_metric_card("EBITDA Margin", ratios.ebitda_margin, value_color="positive" if ratios.ebitda_margin > 0 else "negative", suffix="%"), unsafe_allow_html=True)
             with col2:
-                total_costs = sum([abs(ytd_data.get(c, 0)) for c in ['Operating expense', 'Admin & Overheads', 'Employee Cost', 'Other cost']])
-                cost_ratio = (total_costs / ytd_data['Revenue']) * 100
-                st.markdown(create_metric_card("Cost-to-Revenue", cost_ratio, value_color="negative" if cost_ratio > 80 else "positive", suffix="%"), unsafe_allow_html=True)
+                st.markdown(create_metric_card("Cost-to-Revenue", ratios.cost_ratio, value_color="negative" if ratios.cost_ratio > 80 else "positive", suffix="%"), unsafe_allow_html=True)
             with col3:
-                net_margin = (ytd_data.get('PAT', 0) / ytd_data['Revenue']) * 100
-                st.markdown(create_metric_card("Net Profit Margin", net_margin, value_color="positive" if net_margin > 0 else "negative", suffix="%"), unsafe_allow_html=True)
+                st.markdown(create_metric_card("Net Profit Margin", ratios.net_margin, value_color="positive" if ratios.net_margin > 0 else "negative", suffix="%"), unsafe_allow_html=True)
     else:
         st.info("No processed P&L data to display.")
 
@@ -7,7 +7,9 @@ from datetime import datetime
 # This is the correct way to import modules from sub-folders into the main app.
 # It does NOT use the dot (.) notation.
 from CFS import CFS_Main
+from CFS.Data_Source import ENTITY_KEY
 from PnL import PnL_Analysis
+from cfs_engine.Entities import entity_names
 
 
 # =============================================================================
@@ -95,6 +97,8 @@ st.markdown(f"""
 
 st.sidebar.title("Navigation")
 choice = st.sidebar.radio("Go to", ["CFS", "PnL"], label_visibility="collapsed")
+# Every page shows the selected entity, or the sum of all of them under "Consolidated".
+st.sidebar.selectbox("Entity", entity_names(), key=ENTITY_KEY)
 
 
 if choice == "CFS":
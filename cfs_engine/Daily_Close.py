@@ -0,0 +1,255 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from .Data_Ingestion import FILE_PATH, load_dataset, to_rupees
+from .Entities import ENTITIES, load_entity
+from .KPIs import (
+    BANK_LIMITS, CRORE_CONVERSION, POSITIVE_BALANCE_BANKS, ActivityFlows, BankLimit, CashMetrics, ForecastEfficiency,
+    ForecastMetrics, PeriodKPIs, PredictiveInsights, RunwayStatus, get_runway_history,
+)
+from .Snapshot import MANIFEST_FILE, read_manifest, write_manifest, snapshot_path
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+# Materialized KPIs are stored here as Parquet, one sub-folder per workbook (named like its snapshot).
+DAILY_CLOSE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cfs_daily_close')
+# Bump when the stored columns change so older files are ignored until the job runs again.
+DAILY_CLOSE_FORMAT = 1
+KPI_FILE = 'kpis.parquet'
+BANK_FILE = 'bank_limits.parquet'
+PARQUET_COMPRESSION = 'zstd'
+
+
+# =============================================================================
+# MATERIALIZATION
+# =============================================================================
+# One row per calendar day D of the ledger, holding the Overview KPIs of the default
+# period (first ledger day..D) as get_period_kpis returns them: amounts in crores,
+# except Available_Limit (rupees), runways in days.
+def _period_revenue(inflow_sheet, start_date, days):
+    """extract_revenue for start_date..each day, from one cumulative sum over the billing dates."""
+    try:
+        billed = inflow_sheet.loc[inflow_sheet['Billing_Date'].notna(), ['Billing_Date', 'Amount']].sort_values('Billing_Date')
+        dates = pd.DatetimeIndex(billed['Billing_Date'])
+        running = np.concatenate([[0], np.cumsum(billed['Amount'].to_numpy(dtype='int64'))])
+        lo, hi = dates.searchsorted(start_date, side='left'), dates.searchsorted(days, side='right')
+        return to_rupees(running[np.maximum(lo, hi)] - running[lo]) / CRORE_CONVERSION
+    except Exception:
+        return np.zeros(len(days))
+
+def _predictive_columns(cube, start_date, days, running):
+    """Trend, averages and volatility of perform_predictive_analysis for start_date..each day."""
+    daily = cube.daily(start_date, days[-1])
+    daily_flow = daily.loc[daily['Count'] > 0, 'Net_Flow']
+    # Both windows start at start_date, so one rolling / expanding pass serves every day.
+    ma_7 = daily_flow.rolling(window=7, min_periods=1).mean().to_numpy()
+    volatility = daily_flow.expanding().std().to_numpy()
+    active = np.cumsum(daily['Count'].to_numpy() > 0)
+    last = np.maximum(active - 1, 0)
+    trend = np.where(active >= 7, ma_7[last] - ma_7[np.maximum(active - 7, 0)], 0.0) if len(ma_7) else np.zeros(len(days))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_inflow = np.where(running['Deposit_Count'] > 0, running['Deposit'] / running['Deposit_Count'], np.nan)
+        avg_outflow = np.where(running['Withdrawal_Count'] > 0, running['Withdrawal'] / running['Withdrawal_Count'], np.nan)
+    return {
+        'Has_Predictive': running['Count'].to_numpy() >= 7,
+        'Trend_Value': trend / CRORE_CONVERSION,
+        'Avg_Inflow': avg_inflow / CRORE_CONVERSION,
+        'Avg_Outflow': avg_outflow / CRORE_CONVERSION,
+        'Volatility': np.where(active > 1, volatility[last] if len(volatility) else 0.0, 0.0) / CRORE_CONVERSION,
+    }
+
+def materialize_daily_close(dataset):
+    """
+    (kpis, bank_limits) for every calendar day of the ledger, each KPI computed for all days
+    in one vectorized pass over the prefix-sum indexes. `kpis` has one row per day;
+    `bank_limits` one row per day and bank with the BankLimit fields of get_bank_balances.
+    """
+    cube = dataset.cube
+    if len(cube.days) == 0:
+        return pd.DataFrame(), pd.DataFrame()
+    start_date, days = cube.days[0], cube.days
+    running = cube.cumulative(start_date, days[-1])
+    operating, investing, financing = (cube.cumulative(start_date, days[-1], activity=activity)['Net_Flow'].to_numpy() / CRORE_CONVERSION for activity in ('Operating', 'Investing', 'Financing'))
+    revenue = _period_revenue(dataset.inflow_sheet, start_date, days)
+    period = dataset.forecasts.period_totals(np.repeat(start_date, len(days)), days) / CRORE_CONVERSION
+    today = dataset.forecasts.period_totals(days, days) / CRORE_CONVERSION
+    limits = dataset.bank_limits or BANK_LIMITS
+    runway = get_runway_history(dataset.balances, dataset.forecasts, start_date, days[-1], limits)
+
+    net_flow = running['Net_Flow'].to_numpy() / CRORE_CONVERSION
+    forecast_net_flow = period['inflow'].to_numpy() - period['total'].to_numpy()
+    variance = net_flow - forecast_net_flow
+    with np.errstate(divide='ignore', invalid='ignore'):
+        efficiency = np.where(net_flow != 0, variance / np.abs(net_flow) * 100, np.where(np.abs(variance) > 0.01, 999.0, 0.0))
+        ocf_sales_ratio = np.where(revenue != 0, operating / revenue, 0.0)
+
+    kpis = pd.DataFrame({
+        'Date': days,
+        'Available_Limit': runway['Available_Limit'].to_numpy(),
+        'Runway_Fixed': runway['Fixed'].to_numpy(dtype='int16'),
+        'Runway_Total': runway['Total'].to_numpy(dtype='int16'),
+        'Revenue': revenue,
+        'Total_Inflow': running['Deposit'].to_numpy() / CRORE_CONVERSION,
+        'Total_Outflow': running['Withdrawal'].to_numpy() / CRORE_CONVERSION,
+        'Net_Flow': net_flow,
+        'Operating': operating,
+        'Investing': investing,
+        'Financing': financing,
+        'Forecast_Inflow': period['inflow'].to_numpy(),
+        'Forecast_Fixed': period['fixed'].to_numpy(),
+        'Forecast_Contingency': period['contingency'].to_numpy(),
+        'Forecast_Total': period['total'].to_numpy(),
+        'Today_Fixed': today['fixed'].to_numpy(),
+        'Today_Contingency': today['contingency'].to_numpy(),
+        'Today_Total': today['total'].to_numpy(),
+        'Forecast_Net_Flow': forecast_net_flow,
+        'Forecast_Variance': variance,
+        'Forecast_Efficiency': efficiency,
+        'OCF_Sales_Ratio': ocf_sales_ratio,
+        **_predictive_columns(cube, start_date, days, running),
+    })
+
+    balances = dataset.balances.balances(days, banks=list(limits))
+    bank_limits = []
+    for bank, limit in limits.items():
+        balance = balances[bank].to_numpy()
+        used = -balance if bank in POSITIVE_BALANCE_BANKS else balance
+        bank_limits.append(pd.DataFrame({
+            'Date': days,
+            'Bank': bank,
+            'Limit': limit,
+            'Balance': balance,
+            'Used': used,
+            'Available': (limit + balance) if bank in POSITIVE_BALANCE_BANKS else (limit - balance),
+            'Utilization': (np.abs(used) / limit * 100) if limit > 0 else np.zeros(len(days)),
+        }))
+    bank_limits = pd.concat(bank_limits, ignore_index=True)
+    bank_limits['Bank'] = pd.Categorical(bank_limits['Bank'], categories=list(limits))
+    return kpis, bank_limits
+
+
+# =============================================================================
+# READ / WRITE
+# =============================================================================
+def daily_close_version(file_path, close_dir=None):
+    """Modification token of the materialized files for `file_path`, or None when there are none."""
+    try:
+        return os.stat(os.path.join(snapshot_path(file_path, close_dir or DAILY_CLOSE_DIR), MANIFEST_FILE)).st_mtime_ns
+    except OSError:
+        return None
+
+def write_daily_close(dataset, kpis, bank_limits, close_dir=None, seconds=None):
+    """Writes both tables; the manifest is written last so readers never see a partial set."""
+    folder = snapshot_path(dataset.file_path, close_dir or DAILY_CLOSE_DIR)
+    os.makedirs(folder, exist_ok=True)
+    kpis.to_parquet(os.path.join(folder, KPI_FILE), index=False, compression=PARQUET_COMPRESSION)
+    bank_limits.to_parquet(os.path.join(folder, BANK_FILE), index=False, compression=PARQUET_COMPRESSION)
+    write_manifest(folder, {
+        'format': DAILY_CLOSE_FORMAT,
+        'source': os.path.abspath(dataset.file_path),
+        'data_token': dataset.data_token,
+        'bank_limits': dict(dataset.bank_limits or BANK_LIMITS),
+        'start_date': str(kpis['Date'].iloc[0].date()) if len(kpis) else None,
+        'end_date': str(kpis['Date'].iloc[-1].date()) if len(kpis) else None,
+        'rows': {KPI_FILE: len(kpis), BANK_FILE: len(bank_limits)},
+        'seconds': seconds,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    return folder
+
+def read_daily_close(file_path, data_token, close_dir=None, bank_limits=None):
+    """
+    The materialized KPIs of `file_path` when they were built from the `data_token` version
+    and the same bank limits (BANK_LIMITS by default), else None.
+    """
+    folder = snapshot_path(file_path, close_dir or DAILY_CLOSE_DIR)
+    manifest = read_manifest(folder)
+    if not manifest or manifest.get('format') != DAILY_CLOSE_FORMAT or manifest.get('data_token') != data_token:
+        return None
+    if manifest.get('bank_limits') != dict(bank_limits or BANK_LIMITS):
+        return None
+    kpis = pd.read_parquet(os.path.join(folder, KPI_FILE))
+    bank_limits = pd.read_parquet(os.path.join(folder, BANK_FILE))
+    return DailyClose(kpis, bank_limits, manifest)
+
+
+class DailyClose:
+    """Lookups into the materialized KPIs: one row per day replaces the live computation of the default period."""
+
+    def __init__(self, kpis, bank_limits, manifest=None):
+        self.manifest = manifest or {}
+        self.kpis = kpis.set_index('Date')
+        self.start_date = self.kpis.index[0] if len(self.kpis) else None
+        # Banks keep the order of the limits they were materialized with (see materialize_daily_close).
+        self._banks = {bank: rows.set_index('Date') for bank, rows in bank_limits.groupby('Bank', observed=True)}
+
+    def period_kpis(self, start_date, end_date):
+        """PeriodKPIs of start_date..end_date, or None unless the period starts on the first ledger day and ends on a stored day."""
+        if self.start_date is None or pd.Timestamp(start_date) != self.start_date:
+            return None
+        end_date = pd.Timestamp(end_date)
+        if end_date not in self.kpis.index:
+            return None
+        row = self.kpis.loc[end_date]
+        predictive = None
+        if row['Has_Predictive']:
+            predictive = PredictiveInsights(
+                trend='Increasing' if row['Trend_Value'] > 0 else 'Decreasing',
+                trend_value=row['Trend_Value'], avg_inflow=row['Avg_Inflow'], avg_outflow=row['Avg_Outflow'], volatility=row['Volatility'],
+            )
+        return PeriodKPIs(
+            runway=RunwayStatus(row['Available_Limit'], int(row['Runway_Fixed']), int(row['Runway_Total'])),
+            revenue=row['Revenue'],
+            cash_metrics=CashMetrics(row['Total_Inflow'], row['Total_Outflow'], row['Net_Flow']),
+            flows=ActivityFlows(row['Operating'], row['Investing'], row['Financing']),
+            forecast_inflow=row['Forecast_Inflow'],
+            forecast_outflow=ForecastMetrics(row['Forecast_Fixed'], row['Forecast_Contingency'], row['Forecast_Total']),
+            today_forecast=ForecastMetrics(row['Today_Fixed'], row['Today_Contingency'], row['Today_Total']),
+            efficiency=ForecastEfficiency(row['Net_Flow'], row['Forecast_Net_Flow'], row['Forecast_Variance'], row['Forecast_Efficiency']),
+            ocf_sales_ratio=row['OCF_Sales_Ratio'],
+            predictive=predictive,
+        )
+
+    def bank_balances(self, as_of_date):
+        """{bank: BankLimit} as get_bank_balances returns it, or None for a day that is not stored."""
+        as_of_date = pd.Timestamp(as_of_date)
+        if not self._banks or as_of_date not in self.kpis.index:
+            return None
+        return {
+            bank: BankLimit(*(self._banks[bank].at[as_of_date, column] for column in ('Limit', 'Balance', 'Used', 'Available', 'Utilization')))
+            for bank in self._banks
+        }
+
+
+# =============================================================================
+# COMMAND LINE
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Materialize the Overview and Bank Analysis KPIs of every day of the CFS workbook.")
+    parser.add_argument('--file', default=FILE_PATH, help="Workbook to read (default: Data_Ingestion.FILE_PATH)")
+    parser.add_argument('--entity', default=None, choices=list(ENTITIES), help="Registered entity whose workbook and bank limits to use instead of --file")
+    parser.add_argument('--close-dir', default=None, help=f"Output folder (default: {DAILY_CLOSE_DIR})")
+    parser.add_argument('--snapshot-dir', default=None, help="Snapshot folder used to load the workbook (default: Snapshot.SNAPSHOT_DIR)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    dataset = load_entity(args.entity, args.snapshot_dir) if args.entity else load_dataset(args.file, args.snapshot_dir)
+    loaded = time.perf_counter()
+    kpis, bank_limits = materialize_daily_close(dataset)
+    computed = time.perf_counter()
+    folder = write_daily_close(dataset, kpis, bank_limits, args.close_dir, seconds=round(computed - loaded, 3))
+    written = time.perf_counter()
+
+    print(f"Daily close: {folder}")
+    if len(kpis):
+        print(f"  Days: {kpis['Date'].iloc[0]:%Y-%m-%d} .. {kpis['Date'].iloc[-1]:%Y-%m-%d}")
+    print(f"  {KPI_FILE:<28} {len(kpis):>8,} rows")
+    print(f"  {BANK_FILE:<28} {len(bank_limits):>8,} rows")
+    print(f"Loaded in {loaded - start:.2f}s, computed in {computed - loaded:.3f}s, written in {written - computed:.2f}s")
+
+if __name__ == "__main__":
+    main()
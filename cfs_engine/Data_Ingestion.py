@@ -0,0 +1,484 @@
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from .Forecast_Index import ForecastIndex
+from .Frozen_Data import ReadOnlyDataFrameError, READ_ONLY_MESSAGE, freeze_frame, freeze_mapping
+from .Ledger_Index import BalanceIndex, ConsolidatedLedger, DailyCube
+from .Text_Index import TextIndex
+from .Worker_Pool import map_in_processes
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+# Single source workbook shared by every CFS tab. Update this path to your actual file location.
+FILE_PATH = r"C:\Users\hp\OneDrive\Desktop\Script\OPL\Base data\OPL CFS v2.xlsx"
+CCC_SHEET = "CCC"
+BANK_NAME_MAPPING = {'sbi': 'SBI', 'icici': 'ICICI', 'hdfc': 'HDFC', 'federal': 'Federal', 'axis': 'Axis', 'yes': 'Yes', 'yes bank': 'Yes'}
+
+# Bank sheets only grow at the bottom, so a reload normalizes just the new rows.
+INCREMENTAL_BANK_INGESTION = True
+# Worker processes that parse a workbook's sheets in parallel; 1 parses them in-process one
+# after another, None uses one per CPU. Starting a worker costs about a second (it imports
+# pandas), so this only pays off when the sheets take longer than that to parse.
+SHEET_PARSE_WORKERS = 1
+
+
+# =============================================================================
+# DATASET
+# =============================================================================
+# Text index postings of the last version built per workbook (TextIndex.reuse_state, not the
+# index itself, which references its ledger): the next version only tokenizes appended rows.
+_latest_text_postings = {}
+
+@dataclass
+class CFSDataset:
+    """Everything the CFS tabs read from the workbook, parsed once per file version."""
+    bank_data: dict = field(default_factory=dict)
+    # Bank -> Value_Date and Running_Balance of every dated row of its sheet, including rows that
+    # only carry a balance forward and are not in bank_data (see split_bank_rows, BalanceIndex).
+    bank_balances: dict = field(default_factory=dict)
+    forecast_data: pd.DataFrame = field(default_factory=pd.DataFrame)
+    inflow_forecast_data: pd.DataFrame = field(default_factory=pd.DataFrame)
+    inflow_sheet: pd.DataFrame = field(default_factory=pd.DataFrame)
+    ccc: dict = None
+    # Sanctioned limit per bank in rupees; None uses KPIs.BANK_LIMITS (see Entities.ENTITIES).
+    bank_limits: dict = None
+    file_path: str = ""
+    version: str = ""
+    # Sheet -> output column -> source header it was read from (see _read_columns).
+    resolved_columns: dict = field(default_factory=dict)
+    # Bank sheet -> rows ingested so far and their fingerprint (see read_sheet_tail).
+    ingest_state: dict = field(default_factory=dict)
+    # Sheet -> seconds its last parse took (see parse_workbook).
+    parse_seconds: dict = field(default_factory=dict)
+
+    # Indexes derived from the frames above; built by build_indexes(), never stored in the snapshot.
+    ledger: ConsolidatedLedger = None
+    balances: BalanceIndex = None
+    cube: DailyCube = None
+    forecasts: ForecastIndex = None
+    text_index: TextIndex = None
+
+    @property
+    def data_token(self):
+        """Identifies this workbook version in shared caches; None for a dataset that was not loaded from a file."""
+        return f"{self.file_path}|{self.version}" if self.version else None
+
+    def date_bounds(self):
+        """(first, last) transaction date as `date` objects, or (None, None) without transactions."""
+        return self.ledger.date_bounds() if self.ledger is not None else (None, None)
+
+    def build_indexes(self):
+        """Builds the lookup structures the tabs query, once per data version."""
+        self.ledger = ConsolidatedLedger(self.bank_data, data_token=self.data_token)
+        self.balances = BalanceIndex(self.bank_balances, data_token=self.data_token)
+        self.cube = DailyCube(self.ledger)
+        self.forecasts = ForecastIndex(self.forecast_data, self.inflow_forecast_data, data_token=self.data_token)
+        self.text_index = TextIndex(self.ledger, self.bank_data, previous=_latest_text_postings.get(self.file_path))
+        if self.data_token:
+            _latest_text_postings[self.file_path] = self.text_index.reuse_state()
+        return self
+
+    def freeze(self):
+        """
+        Makes the dataset and its indexes read-only, so one instance can be handed to every
+        session by reference: frames become FrozenFrames, dicts become read-only mappings and
+        assigning an attribute raises ReadOnlyDataFrameError.
+        """
+        set_field = super().__setattr__
+        set_field('bank_data', freeze_mapping(self.bank_data))
+        set_field('bank_balances', freeze_mapping(self.bank_balances))
+        for name in ('forecast_data', 'inflow_forecast_data', 'inflow_sheet'):
+            set_field(name, freeze_frame(getattr(self, name)))
+        for name in ('ccc', 'bank_limits'):
+            if getattr(self, name) is not None:
+                set_field(name, freeze_mapping(getattr(self, name), lambda value: value))
+        for index in (self.ledger, self.balances, self.cube, self.forecasts, self.text_index):
+            if index is not None:
+                index.freeze()
+        set_field('_frozen', True)
+        return self
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise ReadOnlyDataFrameError(READ_ONLY_MESSAGE)
+        super().__setattr__(name, value)
+
+
+def get_file_version(file_path):
+    """Cheap version token for the workbook (size + modification time)."""
+    stat = os.stat(file_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+# =============================================================================
+# SHEET SCHEMA
+# =============================================================================
+@dataclass(frozen=True)
+class ColumnSpec:
+    """A normalized column: 0-based position in the source sheet, dtype ('date', 'float' or 'str') and fill for blanks."""
+    position: int
+    dtype: str
+    fill: object = None
+
+# Sheet kind (see classify_sheet) -> output column -> source column. Only these columns are read from Excel.
+SHEET_SCHEMAS = {
+    'bank': {
+        'Value_Date': ColumnSpec(2, 'date'),
+        'Net_Flow': ColumnSpec(8, 'float'),
+        'Running_Balance': ColumnSpec(9, 'float'),
+        'Category': ColumnSpec(11, 'str', 'Unknown'),
+        'Remarks': ColumnSpec(12, 'str', ''),
+        'Nature': ColumnSpec(13, 'str'),
+    },
+    'forecast': {
+        'Forecast_Date': ColumnSpec(2, 'date'),
+        'Net_Payable': ColumnSpec(6, 'float'),
+        'Certainty': ColumnSpec(15, 'str', 'Unknown'),
+    },
+    'inflow_forecast': {
+        'Forecast_Date': ColumnSpec(24, 'date'),
+        'Amount_Received': ColumnSpec(26, 'float'),
+    },
+    'inflow': {
+        'Billing_Date': ColumnSpec(15, 'date'),
+        'Amount': ColumnSpec(17, 'float'),
+    },
+}
+# Rows missing any of these columns are dropped. Bank rows without a Net_Flow are kept for
+# their Running_Balance but left out of the ledger (see split_bank_rows).
+REQUIRED_COLUMNS = {
+    'bank': ['Value_Date'],
+    'forecast': ['Forecast_Date'],
+    'inflow_forecast': ['Forecast_Date'],
+    'inflow': [],
+}
+# The CCC metrics only read the first row, columns A to X.
+CCC_COLUMNS = 24
+# Cash flow activity codes derived from the bank sheets' Nature (CFS) column, in match priority.
+ACTIVITIES = ['Operating', 'Investing', 'Financing']
+OTHER_ACTIVITY = 'Other'
+
+
+# =============================================================================
+# COMPACT IN-MEMORY REPRESENTATION
+# =============================================================================
+# Every parsed frame is compacted (see compact_frame) before it is cached or snapshotted:
+#   amounts  -> int64 paise: 8 bytes/row, exact, so sums never drift (blank amounts count as 0)
+#   balances -> nullable Int64 paise: a blank Running_Balance stays missing, it is not a balance of 0
+#   labels   -> categorical: a 1-byte code per row (up to 127 distinct labels) + each label stored once
+#   dates    -> datetime64[s]: 8 bytes/row (pandas has no day resolution; [s] is the coarsest unit)
+#   Remarks  -> kept as text, it is free-form and close to unique per row
+# memory_usage(dataset) reports the resulting bytes per frame and column.
+PAISE_PER_RUPEE = 100
+AMOUNT_COLUMNS = ['Net_Flow', 'Deposit', 'Withdrawal', 'Net_Payable', 'Amount_Received', 'Amount']
+NULLABLE_AMOUNT_COLUMNS = ['Running_Balance']
+LABEL_COLUMNS = ['Bank', 'Category', 'Nature', 'Activity', 'Certainty']
+DATE_COLUMNS = ['Value_Date', 'Forecast_Date', 'Billing_Date']
+
+
+# =============================================================================
+# SHEET PARSERS
+# =============================================================================
+def classify_sheet(sheet_name):
+    """Maps a workbook sheet name to (kind, bank_name); kind is None for sheets no tab uses."""
+    sheet_lower = sheet_name.lower()
+    if sheet_lower == 'inflow':
+        return 'inflow', None
+    if sheet_name == CCC_SHEET:
+        return 'ccc', None
+    if 'forecast' in sheet_lower and 'inflow' not in sheet_lower:
+        return 'forecast', None
+    if 'inflow' in sheet_lower and 'forecast' in sheet_lower:
+        return 'inflow_forecast', None
+    bank_name = next((val for key, val in BANK_NAME_MAPPING.items() if key in sheet_lower), None)
+    if bank_name:
+        return 'bank', bank_name
+    return None, None
+
+def _text(series, fill=None):
+    """Coerces a label column to str so it stores as one type (NaN kept unless `fill` is given)."""
+    if fill is not None:
+        return series.fillna(fill).astype(str)
+    return series.where(series.isna(), series.astype(str))
+
+def _read_columns(xls, sheet_name, kind):
+    """
+    Reads the columns declared in SHEET_SCHEMAS[kind] and converts them to their declared dtype. No rows are dropped, so row positions match the sheet.
+    Returns (frame, resolved, header) where `resolved` maps each output column to its source header
+    (None when the sheet is too narrow and the fill value was used) and `header` lists the headers read.
+    """
+    schema = SHEET_SCHEMAS[kind]
+    width = len(pd.read_excel(xls, sheet_name=sheet_name, nrows=0).columns)
+    positions = sorted({spec.position for spec in schema.values() if spec.position < width})
+    raw = pd.read_excel(xls, sheet_name=sheet_name, usecols=positions)
+    by_position = dict(zip(positions, raw.columns))
+
+    columns, resolved = {}, {}
+    for name, spec in schema.items():
+        source = by_position.get(spec.position)
+        resolved[name] = None if source is None else str(source)
+        if source is None:
+            columns[name] = spec.fill
+        elif spec.dtype == 'date':
+            columns[name] = pd.to_datetime(raw[source], errors='coerce')
+        elif spec.dtype == 'float':
+            columns[name] = pd.to_numeric(raw[source], errors='coerce').astype('float64')
+        else:
+            columns[name] = _text(raw[source], spec.fill)
+    return pd.DataFrame(columns, index=raw.index), resolved, [str(c) for c in raw.columns]
+
+def _rows_hash(frame):
+    """Fingerprint of a block of converted rows, stable across separate reads of the same cells."""
+    return hashlib.sha1(frame.to_csv(index=False, header=False).encode('utf-8')).hexdigest()
+
+def _ingest_state(converted, header, mode):
+    """What an incremental read needs to know about the rows ingested so far: all of `converted`."""
+    return {
+        'rows': len(converted),
+        'hash': _rows_hash(converted),
+        'header': header,
+        'mode': mode,
+    }
+
+def derive_ledger_columns(df):
+    """
+    Adds the columns every tab derives from a bank ledger, vectorized and once at ingestion:
+    Deposit / Withdrawal (the positive and negative parts of Net_Flow), Activity (first of
+    ACTIVITIES found in Nature, else OTHER_ACTIVITY) and Category with whitespace normalized.
+    """
+    nature = df['Nature'].astype(str).str.lower().where(df['Nature'].notna(), '')
+    category = df['Category'].astype(str).str.strip().str.replace(r'\s+', ' ', regex=True)
+    return df.assign(
+        Deposit=df['Net_Flow'].clip(lower=0),
+        Withdrawal=(-df['Net_Flow']).clip(lower=0),
+        Activity=np.select([nature.str.contains(a.lower(), regex=False) for a in ACTIVITIES], ACTIVITIES, OTHER_ACTIVITY),
+        Category=category.where(category != '', 'Unknown'),
+    )
+
+def to_rupees(paise):
+    """Converts compacted int64 paise amounts (scalar, array or Series) back to rupees."""
+    return paise / PAISE_PER_RUPEE
+
+def compact_frame(df):
+    """Applies the compact dtypes above to the columns of `df` that have them; already compact columns are left alone."""
+    columns = {}
+    for name in df.columns:
+        column = df[name]
+        if name in AMOUNT_COLUMNS and column.dtype != 'int64':
+            columns[name] = (pd.to_numeric(column, errors='coerce').fillna(0) * PAISE_PER_RUPEE).round().astype('int64')
+        elif name in NULLABLE_AMOUNT_COLUMNS and column.dtype != 'Int64':
+            columns[name] = (pd.to_numeric(column, errors='coerce') * PAISE_PER_RUPEE).round().astype('Int64')
+        elif name in LABEL_COLUMNS and not isinstance(column.dtype, pd.CategoricalDtype):
+            columns[name] = column.astype('category')
+        elif name in DATE_COLUMNS and column.dtype != 'datetime64[s]':
+            columns[name] = column.astype('datetime64[s]')
+    return df.assign(**columns) if columns else df
+
+def memory_usage(dataset):
+    """Resident bytes of every column of every frame in `dataset`, labels and text included (deep)."""
+    frames = [(f"bank:{bank}", df) for bank, df in dataset.bank_data.items()]
+    frames += [(f"balances:{bank}", df) for bank, df in dataset.bank_balances.items()]
+    frames += [('forecast', dataset.forecast_data), ('inflow_forecast', dataset.inflow_forecast_data), ('inflow', dataset.inflow_sheet)]
+    rows = [
+        {'Frame': name, 'Column': column, 'Dtype': str(df[column].dtype), 'Rows': len(df), 'Bytes': int(df[column].memory_usage(index=False, deep=True))}
+        for name, df in frames for column in df.columns
+    ]
+    return pd.DataFrame(rows, columns=['Frame', 'Column', 'Dtype', 'Rows', 'Bytes'])
+
+def split_bank_rows(df, bank_name):
+    """
+    (ledger rows, balance rows) of a bank sheet's dated rows, both compacted. Ledger rows are
+    those with a Net_Flow, with the derived ledger columns; balance rows are the Value_Date and
+    Running_Balance of every row, so balances carried forward without a flow are kept.
+    """
+    ledger = compact_frame(derive_ledger_columns(df.dropna(subset=['Net_Flow']).assign(Bank=bank_name)))
+    return ledger, compact_frame(df[['Value_Date', 'Running_Balance']])
+
+def read_sheet(xls, sheet_name, kind):
+    """Reads a whole sheet. Returns (frame, resolved, ingest_state); see _read_columns."""
+    converted, resolved, header = _read_columns(xls, sheet_name, kind)
+    state = _ingest_state(converted, header, 'full')
+    return converted.dropna(subset=REQUIRED_COLUMNS[kind]), resolved, state
+
+def read_sheet_tail(xls, sheet_name, kind, state):
+    """
+    Returns (new_rows, new_state) with only the rows appended since `state` was taken, or None
+    when a full read is needed: the header changed, rows were removed or any already-ingested
+    row was edited. The whole sheet is still read (openpyxl parses every row up to the tail
+    anyway); what is skipped is normalizing and compacting the rows ingested before.
+    """
+    if 'hash' not in state:
+        return None
+    converted, _, header = _read_columns(xls, sheet_name, kind)
+    ingested = state['rows']
+    if header != state['header'] or len(converted) < ingested:
+        return None
+    if _rows_hash(converted.iloc[:ingested]) != state['hash']:
+        return None
+
+    new_rows = converted.iloc[ingested:].dropna(subset=REQUIRED_COLUMNS[kind])
+    new_state = _ingest_state(converted, header, f"append (+{len(converted) - ingested} rows)")
+    return new_rows, new_state
+
+def compute_ccc_metrics(df_ccc):
+    """Calculates CCC metrics from the header-less CCC sheet."""
+    date_cell = pd.to_datetime(df_ccc.iloc[0, 0])
+    C1, E1 = df_ccc.iloc[0, 2], df_ccc.iloc[0, 4]
+    J1, L1 = df_ccc.iloc[0, 9], df_ccc.iloc[0, 11]
+    S1, V1 = df_ccc.iloc[0, 18], df_ccc.iloc[0, 21]
+    NetSales = df_ccc.iloc[0, 14]
+    COGS = df_ccc.iloc[0, 22] + df_ccc.iloc[0, 23]
+
+    no_of_days = (date_cell - datetime(date_cell.year - (date_cell.month < 4), 4, 1)).days + 1
+    avg_payables = (C1 + E1) / 2
+    avg_receivables = (J1 + L1) / 2
+    avg_inventory = (V1 + S1) / 2
+
+    DSO = (avg_receivables / NetSales) * no_of_days if NetSales != 0 else 0
+    DPO = (avg_payables / COGS) * no_of_days if COGS != 0 else 0
+    DIO = (avg_inventory / COGS) * no_of_days if COGS != 0 else 0
+    CCC = DSO + DIO - DPO
+
+    return {'CCC': CCC, 'DSO': DSO, 'DPO': DPO, 'DIO': DIO}
+
+
+# =============================================================================
+# WORKBOOK LOADING
+# =============================================================================
+@dataclass
+class ParsedSheet:
+    """What parsing one sheet produced; only this crosses back from a worker process."""
+    sheet: str
+    kind: str
+    bank_name: str = None
+    mode: str = 'full'          # 'full', 'append' (new rows only), 'ccc' or 'skipped'
+    frame: pd.DataFrame = None  # compacted rows (see compact_frame)
+    balances: pd.DataFrame = None  # bank sheets: compacted balance rows (see split_bank_rows)
+    resolved: dict = None
+    state: dict = None
+    ccc: dict = None
+    seconds: float = 0.0
+
+def parse_sheet(xls, sheet, kind, bank_name=None, previous_state=None):
+    """
+    Parses one sheet into a ParsedSheet. With the bank sheet's `previous_state` only the rows
+    appended since then are read when possible (see read_sheet_tail). An unreadable bank sheet
+    is skipped and an unreadable CCC sheet gives no metrics; other errors are raised.
+    """
+    start = time.perf_counter()
+    parsed = ParsedSheet(sheet, kind, bank_name)
+    if kind == 'ccc':
+        parsed.mode = 'ccc'
+        try:
+            parsed.ccc = compute_ccc_metrics(pd.read_excel(xls, sheet_name=sheet, header=None, nrows=1, usecols=range(CCC_COLUMNS)))
+        except Exception:
+            parsed.ccc = None
+        parsed.seconds = time.perf_counter() - start
+        return parsed
+
+    tail = None
+    if previous_state is not None:
+        try:
+            tail = read_sheet_tail(xls, sheet, kind, previous_state)
+        except Exception:
+            tail = None
+    if tail is not None:
+        new_rows, parsed.state = tail
+        parsed.mode = 'append'
+        parsed.frame, parsed.balances = split_bank_rows(new_rows, bank_name)
+    else:
+        try:
+            df, parsed.resolved, parsed.state = read_sheet(xls, sheet, kind)
+        except Exception:
+            if kind != 'bank':
+                raise
+            parsed.mode = 'skipped'
+        else:
+            if kind == 'bank':
+                parsed.frame, parsed.balances = split_bank_rows(df, bank_name)
+            else:
+                parsed.frame = compact_frame(df)
+    parsed.seconds = time.perf_counter() - start
+    return parsed
+
+# Workbook opened by this worker process, reused for every sheet it is given.
+_worker_workbook = {}
+
+def _parse_sheet_in_worker(file_path, sheet, kind, bank_name, previous_state):
+    """Worker: parse_sheet on the worker's own handle to the workbook."""
+    if file_path not in _worker_workbook:
+        _worker_workbook.clear()
+        _worker_workbook[file_path] = pd.ExcelFile(file_path)
+    return parse_sheet(_worker_workbook[file_path], sheet, kind, bank_name, previous_state)
+
+def parse_workbook(file_path, previous=None, workers=SHEET_PARSE_WORKERS):
+    """
+    Parses every sheet exactly once into a CFSDataset: in this process with `workers` 1,
+    otherwise in that many worker processes (None: one per CPU), each returning its compacted
+    frames. With a `previous` dataset of the same workbook (and INCREMENTAL_BANK_INGESTION on),
+    bank sheets only parse the rows appended since then; see read_sheet_tail.
+    """
+    dataset = CFSDataset(file_path=file_path, version=get_file_version(file_path))
+    with pd.ExcelFile(file_path) as xls:
+        jobs = []
+        for sheet in xls.sheet_names:
+            kind, bank_name = classify_sheet(sheet)
+            if kind is None:
+                continue
+            previous_state = None
+            if kind == 'bank' and INCREMENTAL_BANK_INGESTION and previous is not None and bank_name in previous.bank_balances:
+                previous_state = previous.ingest_state.get(sheet)
+            jobs.append((sheet, kind, bank_name, previous_state))
+        if workers == 1 or len(jobs) < 2:
+            results = [parse_sheet(xls, *job) for job in jobs]
+        else:
+            results = map_in_processes(_parse_sheet_in_worker, [(file_path, *job) for job in jobs], workers)
+
+    # Sheets are applied in workbook order, so a later sheet of the same kind or bank wins as before.
+    for parsed in results:
+        dataset.parse_seconds[parsed.sheet] = parsed.seconds
+        if parsed.mode == 'ccc':
+            dataset.ccc = parsed.ccc
+        elif parsed.mode == 'append':
+            dataset.ingest_state[parsed.sheet] = parsed.state
+            dataset.resolved_columns[parsed.sheet] = previous.resolved_columns.get(parsed.sheet, {})
+            dataset.bank_data[parsed.bank_name] = pd.concat([previous.bank_data[parsed.bank_name], parsed.frame], ignore_index=True)
+            dataset.bank_balances[parsed.bank_name] = pd.concat([previous.bank_balances[parsed.bank_name], parsed.balances], ignore_index=True)
+        elif parsed.mode == 'full':
+            dataset.resolved_columns[parsed.sheet] = parsed.resolved
+            if parsed.kind == 'inflow':
+                dataset.inflow_sheet = parsed.frame
+            elif parsed.kind == 'forecast':
+                dataset.forecast_data = parsed.frame
+            elif parsed.kind == 'inflow_forecast':
+                dataset.inflow_forecast_data = parsed.frame
+            else:
+                dataset.ingest_state[parsed.sheet] = parsed.state
+                dataset.bank_data[parsed.bank_name] = parsed.frame
+                dataset.bank_balances[parsed.bank_name] = parsed.balances
+
+    # Appended ledgers concatenate to plain labels when their categories differ, so compacting runs last.
+    dataset.bank_data = {bank: compact_frame(df) for bank, df in dataset.bank_data.items()}
+    dataset.bank_balances = {bank: compact_frame(df) for bank, df in dataset.bank_balances.items()}
+    dataset.forecast_data = compact_frame(dataset.forecast_data)
+    dataset.inflow_forecast_data = compact_frame(dataset.inflow_forecast_data)
+    dataset.inflow_sheet = compact_frame(dataset.inflow_sheet)
+    return dataset
+
+def load_dataset(file_path=FILE_PATH, snapshot_dir=None, bank_limits=None):
+    """
+    Parsed, indexed and read-only dataset for `file_path`, read from its Parquet snapshot
+    when the workbook is unchanged (see Snapshot.load_or_build_snapshot). Nothing is cached
+    between calls; errors reading the workbook are raised. `bank_limits` overrides
+    KPIs.BANK_LIMITS for this workbook's entity.
+    """
+    from .Snapshot import load_or_build_snapshot
+    dataset = load_or_build_snapshot(file_path, snapshot_dir)
+    dataset.bank_limits = bank_limits
+    return dataset.build_indexes().freeze()
@@ -0,0 +1,140 @@
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+import pandas as pd
+
+from .Data_Ingestion import FILE_PATH, load_dataset
+from .Forecast_Index import ForecastIndex
+from .Frozen_Data import freeze_frame
+from .KPIs import BANK_LIMITS
+from .Ledger_Index import BalanceIndex, DailyCube
+from .PnL import PL_FILE_PATH
+from .Snapshot import load_or_build_snapshot, snapshot_is_current
+from .Worker_Pool import map_in_processes
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+# Entity -> its workbooks. Every 'cfs' workbook has the structure Data_Ingestion reads;
+# 'pnl' (optional) is the entity's financial statements workbook and 'bank_limits'
+# (optional, default KPIs.BANK_LIMITS) its sanctioned limit per bank in rupees.
+ENTITIES = {
+    'OPL': {'cfs': FILE_PATH, 'pnl': PL_FILE_PATH, 'bank_limits': BANK_LIMITS},
+}
+# Selector label of the group view over every entity in ENTITIES.
+CONSOLIDATED = 'Consolidated'
+# Worker processes that parse out-of-date workbooks concurrently; None uses one per CPU.
+ENTITY_LOAD_WORKERS = None
+
+
+def entity_names():
+    """Choices of the entity selector: every entity, then the consolidated view when there are several."""
+    names = list(ENTITIES)
+    return names + [CONSOLIDATED] if len(names) > 1 else names
+
+def entity_bank_limits(entity):
+    """Sanctioned limit per bank of one entity."""
+    return ENTITIES[entity].get('bank_limits') or BANK_LIMITS
+
+
+# =============================================================================
+# PARALLEL LOADING
+# =============================================================================
+def _build_snapshot(file_path, snapshot_dir):
+    """Worker: parses one workbook into its Parquet snapshot and returns the seconds it took."""
+    start = time.perf_counter()
+    # Workbooks already run one per process here, so their sheets are not fanned out again.
+    load_or_build_snapshot(file_path, snapshot_dir, workers=1)
+    return time.perf_counter() - start
+
+def prepare_snapshots(file_paths, snapshot_dir=None, max_workers=ENTITY_LOAD_WORKERS):
+    """
+    Brings the snapshot of every workbook up to date, parsing the out-of-date ones in
+    worker processes at the same time (Excel parsing is CPU-bound, so threads would not
+    overlap). Only the snapshots cross the process boundary, never the frames, so loading
+    afterwards reads Parquet. Returns {file_path: seconds} for the workbooks it parsed.
+    """
+    stale = [path for path in dict.fromkeys(file_paths) if not snapshot_is_current(path, snapshot_dir)]
+    if len(stale) < 2 or max_workers == 1:
+        return {path: _build_snapshot(path, snapshot_dir) for path in stale}
+    return dict(zip(stale, map_in_processes(_build_snapshot, [(path, snapshot_dir) for path in stale], max_workers)))
+
+def load_entity(entity, snapshot_dir=None):
+    """Indexed, read-only dataset of one registered entity, with its bank limits."""
+    return load_dataset(ENTITIES[entity]['cfs'], snapshot_dir, bank_limits=entity_bank_limits(entity))
+
+def load_entities(entities=None, snapshot_dir=None, max_workers=ENTITY_LOAD_WORKERS):
+    """{entity: dataset} for `entities` (default: all), their workbooks parsed concurrently when out of date."""
+    entities = list(entities or ENTITIES)
+    prepare_snapshots([ENTITIES[entity]['cfs'] for entity in entities], snapshot_dir, max_workers)
+    return {entity: load_entity(entity, snapshot_dir) for entity in entities}
+
+
+# =============================================================================
+# CONSOLIDATION
+# =============================================================================
+@dataclass
+class ConsolidatedDataset:
+    """
+    The group view over several entities, with the attributes the CFS tabs read from a
+    CFSDataset. It is built from each entity's aggregates only (daily cube, forecast and
+    balance indexes, billed revenue per day, bank limits), which are summed; ledgers are
+    never concatenated, so there is no group `ledger` or `text_index`.
+    """
+    entities: dict = field(default_factory=dict)
+    cube: DailyCube = None
+    forecasts: ForecastIndex = None
+    balances: BalanceIndex = None
+    inflow_sheet: pd.DataFrame = field(default_factory=pd.DataFrame)
+    bank_limits: dict = None
+    # Cycle days do not add up across entities.
+    ccc: dict = None
+    ledger = None
+    text_index = None
+    file_path = ""
+
+    @property
+    def data_token(self):
+        """Identifies the set of entity versions in shared caches; None if any entity was not loaded from a file."""
+        tokens = [dataset.data_token for dataset in self.entities.values()]
+        return "+".join(tokens) if tokens and all(tokens) else None
+
+    @property
+    def bank_data(self):
+        """{(entity, bank): bank sheet} of every entity, by reference."""
+        return MappingProxyType({(entity, bank): df for entity, dataset in self.entities.items() for bank, df in dataset.bank_data.items()})
+
+    def date_bounds(self):
+        """(first, last) transaction date across the entities, or (None, None) without transactions."""
+        bounds = [dataset.date_bounds() for dataset in self.entities.values()]
+        bounds = [(lo, hi) for lo, hi in bounds if lo is not None]
+        if not bounds:
+            return None, None
+        return min(lo for lo, _ in bounds), max(hi for _, hi in bounds)
+
+def _billed_per_day(inflow_sheet):
+    """Inflow sheet Amount summed per Billing_Date; empty when the sheet has neither column."""
+    if inflow_sheet.empty or not {'Billing_Date', 'Amount'}.issubset(inflow_sheet.columns):
+        return pd.DataFrame(columns=['Billing_Date', 'Amount'])
+    return inflow_sheet.groupby('Billing_Date', as_index=False)['Amount'].sum()
+
+def consolidate(datasets):
+    """ConsolidatedDataset of {entity: dataset}, summing their aggregates (see ConsolidatedDataset)."""
+    consolidated = ConsolidatedDataset(entities=dict(datasets))
+    token = consolidated.data_token
+    indexed = [dataset for dataset in datasets.values() if dataset.cube is not None]
+    consolidated.cube = DailyCube.combine([dataset.cube for dataset in indexed], data_token=token).freeze()
+    consolidated.forecasts = ForecastIndex.combine([dataset.forecasts for dataset in indexed], data_token=token).freeze()
+    consolidated.balances = BalanceIndex.combine([dataset.balances for dataset in indexed], data_token=token).freeze()
+
+    billed = [_billed_per_day(dataset.inflow_sheet) for dataset in datasets.values()]
+    billed = [frame for frame in billed if not frame.empty]
+    if billed:
+        consolidated.inflow_sheet = freeze_frame(_billed_per_day(pd.concat(billed, ignore_index=True)))
+
+    bank_limits = {}
+    for dataset in datasets.values():
+        for bank, limit in (dataset.bank_limits or BANK_LIMITS).items():
+            bank_limits[bank] = bank_limits.get(bank, 0) + limit
+    consolidated.bank_limits = MappingProxyType(bank_limits)
+    return consolidated
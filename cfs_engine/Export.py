@@ -0,0 +1,135 @@
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from .Data_Ingestion import FILE_PATH, to_rupees
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+# Label -> (file extension, MIME type) of the export formats.
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+# Rows converted and written at a time: memory use depends on this, not on the export size.
+EXPORT_CHUNK_ROWS = 5000
+# Exports are written to a temporary file that stays in memory up to this size and spills to disk beyond it.
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+# Ledger columns written by a transaction export, in order; amounts are converted to rupees.
+TRANSACTION_EXPORT_COLUMNS = ['Value_Date', 'Bank', 'Category', 'Nature', 'Activity', 'Deposit', 'Withdrawal', 'Net_Flow', 'Running_Balance', 'Remarks']
+AMOUNT_EXPORT_COLUMNS = ['Deposit', 'Withdrawal', 'Net_Flow', 'Running_Balance']
+
+
+# =============================================================================
+# CHUNKING
+# =============================================================================
+def iter_chunks(frame, positions=None, chunk_rows=EXPORT_CHUNK_ROWS, convert=None):
+    """
+    Yields the rows of `frame` (only `positions`, in that order, when given) as DataFrames of
+    at most `chunk_rows` rows, each passed through `convert`. Always yields at least one
+    (possibly empty) chunk so writers know the columns.
+    """
+    if positions is None:
+        positions = np.arange(len(frame))
+    for start in range(0, max(len(positions), 1), chunk_rows):
+        chunk = frame.iloc[positions[start:start + chunk_rows]]
+        yield convert(chunk) if convert is not None else chunk
+
+def export_transactions(rows):
+    """Ledger rows as written to an export file: labels as text (missing ones empty) and amounts in rupees."""
+    columns = {}
+    for name in TRANSACTION_EXPORT_COLUMNS:
+        if name not in rows.columns:
+            continue
+        column = rows[name]
+        if name in AMOUNT_EXPORT_COLUMNS:
+            # Running_Balance is nullable (see Data_Ingestion.compact_frame); a blank one stays blank.
+            columns[name] = to_rupees(column.to_numpy(dtype='float64', na_value=np.nan))
+        elif isinstance(column.dtype, pd.CategoricalDtype):
+            columns[name] = column.astype(str).where(column.notna(), '').to_numpy()
+        else:
+            columns[name] = column.to_numpy()
+    return pd.DataFrame(columns)
+
+
+# =============================================================================
+# WRITERS
+# =============================================================================
+# Each writer consumes the chunks one by one and writes them to the binary file `fh`.
+def write_csv(chunks, fh):
+    for i, chunk in enumerate(chunks):
+        fh.write(chunk.to_csv(index=False, header=(i == 0)).encode('utf-8'))
+
+def write_parquet(chunks, fh):
+    """One Parquet row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False, schema=writer.schema if writer else None)
+            if writer is None:
+                writer = pq.ParquetWriter(fh, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def write_xlsx(chunks, fh, sheet_name='Export'):
+    """openpyxl in write-only mode, which streams rows to disk instead of keeping every cell in memory."""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            sheet.append([str(name) for name in chunk.columns])
+        for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False):
+            sheet.append(list(row))
+    workbook.save(fh)
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet, 'xlsx': write_xlsx}
+
+def export_file(chunks, extension):
+    """Writes the chunks in the format of `extension` to a temporary file and returns it rewound for reading."""
+    fh = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    WRITERS[extension](chunks, fh)
+    fh.seek(0)
+    return fh
+
+
+# =============================================================================
+# COMMAND LINE
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export CFS ledger transactions to CSV, Parquet or XLSX.")
+    parser.add_argument('output', help="File to write; the format follows its extension (.csv, .parquet or .xlsx)")
+    parser.add_argument('--file', default=FILE_PATH, help="Workbook to export from (default: Data_Ingestion.FILE_PATH)")
+    parser.add_argument('--from', dest='start_date', default=None, help="First Value_Date to export (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end_date', default=None, help="Last Value_Date to export (YYYY-MM-DD)")
+    parser.add_argument('--bank', action='append', default=None, help="Only this bank (repeatable)")
+    parser.add_argument('--search', default='', help="Only rows whose Remarks / Category match these words")
+    args = parser.parse_args(argv)
+
+    extension = args.output.rsplit('.', 1)[-1].lower()
+    if extension not in WRITERS:
+        parser.error(f"Unsupported format '.{extension}': use " + ", ".join(f".{ext}" for ext in WRITERS))
+
+    from .Snapshot import load_or_build_snapshot
+    start = time.perf_counter()
+    dataset = load_or_build_snapshot(args.file).build_indexes()
+    transactions = dataset.ledger.between(args.start_date, args.end_date)
+    positions = dataset.text_index.search(args.search, args.start_date, args.end_date)
+    if args.bank:
+        positions = positions[transactions['Bank'].iloc[positions].isin(args.bank).to_numpy()]
+
+    # Written straight to the output file, one chunk at a time.
+    with open(args.output, 'wb') as fh:
+        WRITERS[extension](iter_chunks(transactions, positions, convert=export_transactions), fh)
+    print(f"Exported {len(positions):,} transactions to {args.output} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
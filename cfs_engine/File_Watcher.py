@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+import zipfile
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+WATCH_POLL_SECONDS = 2.0
+# A change is only published once size + mtime have stayed the same this long,
+# so OneDrive syncs and Excel saves that land in several writes count as one change.
+WATCH_DEBOUNCE_SECONDS = 5.0
+
+
+def stat_signature(file_path):
+    """Size + modification time of `file_path`, or None if it cannot be read right now."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def is_complete_workbook(file_path):
+    """An .xlsx/.xlsm is a zip archive; a half-written one fails this check."""
+    if os.path.splitext(file_path)[1].lower() not in ('.xlsx', '.xlsm'):
+        return True
+    try:
+        return zipfile.is_zipfile(file_path)
+    except OSError:
+        return False
+
+
+class WorkbookWatcher:
+    """
+    Polls a set of workbook paths from a background thread and publishes a new data
+    version for a path only after its change has settled. Listeners registered with
+    `on_change` are called from the watcher thread as `listener(file_path, version)`.
+    """
+
+    def __init__(self, poll_interval=WATCH_POLL_SECONDS, debounce=WATCH_DEBOUNCE_SECONDS):
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._files = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cfs-workbook-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def on_change(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def watch(self, file_path):
+        """Starts watching `file_path` and returns its current version."""
+        with self._lock:
+            entry = self._files.get(file_path)
+            if entry is None:
+                version = stat_signature(file_path)
+                if version is None:
+                    raise FileNotFoundError(f"Workbook not found: {file_path}")
+                entry = self._files[file_path] = {'version': version, 'pending': None, 'pending_since': 0.0}
+            return entry['version']
+
+    def version(self, file_path):
+        """Data version token for `file_path`; it only changes once a modification has settled."""
+        return self.watch(file_path)
+
+    def poll(self, now=None):
+        """Checks every watched file once; returns the paths whose version changed."""
+        now = time.monotonic() if now is None else now
+        changed = []
+        with self._lock:
+            for file_path, entry in self._files.items():
+                current = stat_signature(file_path)
+                if current is None or current == entry['version']:
+                    entry['pending'] = None
+                    continue
+                if current != entry['pending']:
+                    entry['pending'], entry['pending_since'] = current, now
+                    continue
+                if now - entry['pending_since'] >= self.debounce and is_complete_workbook(file_path):
+                    entry['version'], entry['pending'] = current, None
+                    changed.append((file_path, current))
+            listeners = list(self._listeners)
+
+        for file_path, version in changed:
+            for listener in listeners:
+                try:
+                    listener(file_path, version)
+                except Exception:
+                    pass
+        return [file_path for file_path, _ in changed]
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self.poll()
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+from .Frozen_Data import freeze_arrays
+
+# =============================================================================
+# FORECAST PREFIX-SUM INDEX
+# =============================================================================
+NO_BREACH_DAYS = 999
+PAISE_PER_RUPEE = 100
+
+
+def _union_dates(date_indexes):
+    """Sorted distinct dates of several DatetimeIndexes."""
+    return pd.DatetimeIndex([]).append(list(date_indexes)).unique().sort_values()
+
+
+class ForecastIndex:
+    """
+    Outflow and inflow forecasts summed per forecast date, split by certainty
+    (lower-cased), with prefix sums so any period total is O(1) and the runway
+    breach date for any as-of date is a binary search.
+    """
+
+    def __init__(self, forecast_data, inflow_forecast_data, data_token=None):
+        self.data_token = data_token
+        if forecast_data.empty:
+            self._set_outflows(pd.DatetimeIndex([]), [], np.zeros((0, 0), dtype='int64'), np.zeros((0, 0), dtype='int64'))
+        else:
+            # Lower-case the distinct labels once and map the codes, instead of every row.
+            certainty = forecast_data['Certainty'].astype('category')
+            outflows = pd.DataFrame({
+                'Forecast_Date': forecast_data['Forecast_Date'],
+                'Certainty': certainty.cat.categories.str.lower().take(certainty.cat.codes.to_numpy()),
+                'Net_Payable': forecast_data['Net_Payable'].to_numpy(dtype='int64'),
+            })
+            per_day = outflows.groupby(['Forecast_Date', 'Certainty'], observed=True)['Net_Payable'].agg(['sum', 'size']).unstack(fill_value=0)
+            self._set_outflows(pd.DatetimeIndex(per_day.index), [str(level) for level in per_day['sum'].columns],
+                               per_day['sum'].to_numpy(dtype='int64'), per_day['size'].to_numpy(dtype='int64'))
+
+        if inflow_forecast_data.empty:
+            self._set_inflows(pd.DatetimeIndex([]), np.zeros(0, dtype='int64'))
+        else:
+            inflows = inflow_forecast_data.groupby('Forecast_Date')['Amount_Received'].sum().sort_index()
+            self._set_inflows(pd.DatetimeIndex(inflows.index), inflows.to_numpy(dtype='int64'))
+
+    def _set_outflows(self, dates, certainties, daily, counts):
+        """Per-date outflow sums and row counts (dates x certainties) and their prefix sums."""
+        self.dates, self.certainties = dates, certainties
+        # Amounts are int64 paise (see Data_Ingestion.compact_frame): summed exactly, returned in rupees.
+        self._daily = daily
+        self._prefix = np.vstack([np.zeros((1, daily.shape[1]), dtype='int64'), np.cumsum(daily, axis=0)])
+        self._count_prefix = np.vstack([np.zeros((1, counts.shape[1]), dtype='int64'), np.cumsum(counts, axis=0)])
+        self._counts = counts
+
+    def _set_inflows(self, dates, amounts):
+        """Per-date inflow sums and their prefix sum."""
+        self.inflow_dates = dates
+        self._inflow_prefix = np.concatenate([[0], np.cumsum(amounts)]).astype('int64')
+
+    @classmethod
+    def combine(cls, indexes, data_token=None):
+        """
+        Index of several forecasts together (e.g. one per entity), built by summing their
+        per-date totals over the union of their dates; the forecast rows are not needed.
+        """
+        combined = cls.__new__(cls)
+        combined.data_token = data_token
+        dates = _union_dates([index.dates for index in indexes])
+        certainties = list(dict.fromkeys(level for index in indexes for level in index.certainties))
+        daily = np.zeros((len(dates), len(certainties)), dtype='int64')
+        counts = np.zeros_like(daily)
+        inflow_dates = _union_dates([index.inflow_dates for index in indexes])
+        inflows = np.zeros(len(inflow_dates), dtype='int64')
+        for index in indexes:
+            cells = np.ix_(dates.get_indexer(index.dates), [certainties.index(level) for level in index.certainties])
+            daily[cells] += index._daily
+            counts[cells] += index._counts
+            inflows[inflow_dates.get_indexer(index.inflow_dates)] += np.diff(index._inflow_prefix)
+        combined._set_outflows(dates, certainties, daily, counts)
+        combined._set_inflows(inflow_dates, inflows)
+        return combined
+
+    # -------------------------------------------------------------------------
+    def _columns(self, certainty_levels):
+        return [self.certainties.index(level) for level in certainty_levels if level in self.certainties]
+
+    @staticmethod
+    def _bounds(dates, start_date, end_date):
+        lo = dates.searchsorted(pd.Timestamp(start_date), side='left')
+        hi = dates.searchsorted(pd.Timestamp(end_date), side='right')
+        return lo, max(lo, hi)
+
+    def outflow_totals(self, start_date, end_date):
+        """Forecast outflow for start_date..end_date (inclusive): {'fixed', 'contingency', 'total'}."""
+        lo, hi = self._bounds(self.dates, start_date, end_date)
+        period = (self._prefix[hi] - self._prefix[lo]) / PAISE_PER_RUPEE
+        by_level = dict(zip(self.certainties, period))
+        return {'fixed': by_level.get('fixed', 0.0), 'contingency': by_level.get('contingency', 0.0), 'total': period.sum()}
+
+    def inflow_total(self, start_date, end_date):
+        """Forecast inflow for start_date..end_date (inclusive)."""
+        lo, hi = self._bounds(self.inflow_dates, start_date, end_date)
+        return (self._inflow_prefix[hi] - self._inflow_prefix[lo]) / PAISE_PER_RUPEE
+
+    def period_totals(self, start_dates, end_dates):
+        """
+        outflow_totals and inflow_total for many start_dates[i]..end_dates[i] periods in one pass:
+        a DataFrame with fixed, contingency, total and inflow columns, one row per period.
+        """
+        start_dates, end_dates = pd.DatetimeIndex(start_dates), pd.DatetimeIndex(end_dates)
+        lo, hi = self.dates.searchsorted(start_dates, side='left'), self.dates.searchsorted(end_dates, side='right')
+        hi = np.maximum(lo, hi)
+        period = (self._prefix[hi] - self._prefix[lo]) / PAISE_PER_RUPEE
+        zeros = np.zeros(len(end_dates))
+        by_level = {level: period[:, col] for col, level in enumerate(self.certainties)}
+        in_lo, in_hi = self.inflow_dates.searchsorted(start_dates, side='left'), self.inflow_dates.searchsorted(end_dates, side='right')
+        return pd.DataFrame({
+            'fixed': by_level.get('fixed', zeros),
+            'contingency': by_level.get('contingency', zeros),
+            'total': period.sum(axis=1),
+            'inflow': (self._inflow_prefix[np.maximum(in_lo, in_hi)] - self._inflow_prefix[in_lo]) / PAISE_PER_RUPEE,
+        })
+
+    def row_count(self, start_date, end_date):
+        """Number of outflow forecast rows dated start_date..end_date (inclusive)."""
+        lo, hi = self._bounds(self.dates, start_date, end_date)
+        return int((self._count_prefix[hi] - self._count_prefix[lo]).sum())
+
+    def daily_outflows(self, start_date, end_date, certainty):
+        """Per-date outflow of one certainty level, only on dates that have rows of that level."""
+        if certainty not in self.certainties:
+            return pd.Series(dtype='float64')
+        lo, hi = self._bounds(self.dates, start_date, end_date)
+        col = self.certainties.index(certainty)
+        has_rows = self._counts[lo:hi, col] > 0
+        return pd.Series(self._daily[lo:hi, col][has_rows] / PAISE_PER_RUPEE, index=self.dates[lo:hi][has_rows])
+
+    def runway_days(self, total_balance_available, as_of_date, certainty_levels):
+        """
+        Days from as_of_date until cumulative forecast outflows of the given certainty levels
+        (dated after as_of_date) exceed the available balance. 0 when the balance is not positive
+        or nothing is forecast, NO_BREACH_DAYS when the balance is never exceeded.
+        """
+        return int(self.runway_days_many([total_balance_available], [as_of_date], certainty_levels)[0])
+
+    def runway_days_many(self, balances, as_of_dates, certainty_levels):
+        """
+        runway_days for many (available balance, as-of date) pairs in one pass: every as-of
+        date is located in the cumulative outflow and every breach found by one vectorized
+        searchsorted. Returns an int64 array aligned with `as_of_dates`.
+        """
+        as_of_dates = pd.DatetimeIndex(as_of_dates).normalize()
+        balances = np.asarray(balances, dtype='float64')
+        days = np.zeros(len(as_of_dates), dtype='int64')
+        cols = self._columns(certainty_levels)
+        if not cols or len(as_of_dates) == 0:
+            return days
+
+        start = self.dates.searchsorted(as_of_dates, side='right')
+        counts = self._count_prefix[:, cols].sum(axis=1)
+        active = (balances > 0) & (counts[-1] - counts[start] > 0)
+
+        spend = self._prefix[:, cols].sum(axis=1)
+        threshold = spend[start] + balances * PAISE_PER_RUPEE
+        # Cumulative spend can dip (negative payables), so search its running maximum;
+        # that is only valid when nothing up to the as-of date already exceeds the threshold.
+        running_max = np.maximum.accumulate(spend)
+        pos = running_max.searchsorted(threshold, side='right')
+        for i in np.flatnonzero(active & (running_max[start] > threshold)):
+            above = np.flatnonzero(spend[start[i] + 1:] > threshold[i])
+            pos[i] = start[i] + 1 + above[0] if len(above) else len(spend)
+
+        breached = active & (pos < len(spend))
+        breach_dates = self.dates[np.maximum(pos[breached], 1) - 1]
+        days[breached] = np.maximum(0, (breach_dates - as_of_dates[breached]).days)
+        days[active & ~breached] = NO_BREACH_DAYS
+        return days
+
+    def freeze(self):
+        """Makes the index read-only so it can be shared between sessions."""
+        return freeze_arrays(self)
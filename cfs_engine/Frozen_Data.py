@@ -0,0 +1,86 @@
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# READ-ONLY FRAMES
+# =============================================================================
+READ_ONLY_MESSAGE = "The cached CFS dataset is shared by all sessions and is read-only; work on a .copy() instead."
+
+
+class ReadOnlyDataFrameError(TypeError):
+    """Raised when code tries to modify a frame of the shared dataset."""
+
+
+class _ReadOnlyIndexer:
+    """Wraps .loc / .iloc / .at / .iat: reads pass through, assignments raise."""
+
+    def __init__(self, indexer):
+        self._indexer = indexer
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        raise ReadOnlyDataFrameError(READ_ONLY_MESSAGE)
+
+    def __getattr__(self, name):
+        return getattr(self._indexer, name)
+
+    def __call__(self, *args, **kwargs):
+        return _ReadOnlyIndexer(self._indexer(*args, **kwargs))
+
+
+class FrozenFrame(pd.DataFrame):
+    """
+    A DataFrame that refuses in-place changes: column assignment or deletion, indexer
+    assignment, inplace=True methods and relabelling raise ReadOnlyDataFrameError, and its
+    NumPy buffers are write-protected. Anything derived from it (slices, filters, assign,
+    copy) is an ordinary, writable DataFrame.
+    """
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def _refuse(self, *args, **kwargs):
+        raise ReadOnlyDataFrameError(READ_ONLY_MESSAGE)
+
+    __setitem__ = __delitem__ = insert = pop = update = _update_inplace = _refuse
+
+    def __setattr__(self, name, value):
+        if name in ('columns', 'index') or ('_mgr' in self.__dict__ and name in self.columns):
+            self._refuse()
+        super().__setattr__(name, value)
+
+    loc = property(lambda self: _ReadOnlyIndexer(pd.DataFrame.loc.__get__(self)))
+    iloc = property(lambda self: _ReadOnlyIndexer(pd.DataFrame.iloc.__get__(self)))
+    at = property(lambda self: _ReadOnlyIndexer(pd.DataFrame.at.__get__(self)))
+    iat = property(lambda self: _ReadOnlyIndexer(pd.DataFrame.iat.__get__(self)))
+
+
+def freeze_array(array):
+    """Write-protects a NumPy array in place (other values are returned unchanged)."""
+    if isinstance(array, np.ndarray):
+        array.flags.writeable = False
+    return array
+
+def freeze_frame(df):
+    """Read-only view of `df` sharing its data (no copy)."""
+    if isinstance(df, FrozenFrame):
+        return df
+    frozen = FrozenFrame(df)
+    for block in frozen._mgr.blocks:
+        values = block.values
+        freeze_array(values.codes if isinstance(values, pd.Categorical) else values)
+    return frozen
+
+def freeze_arrays(obj):
+    """Write-protects every NumPy array held directly as an attribute of `obj`."""
+    for value in vars(obj).values():
+        freeze_array(value)
+    return obj
+
+def freeze_mapping(mapping, freeze_value=freeze_frame):
+    """Read-only {key: frozen value} view."""
+    return MappingProxyType({key: freeze_value(value) for key, value in mapping.items()})
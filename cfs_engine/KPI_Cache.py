@@ -0,0 +1,161 @@
+import dataclasses
+import functools
+import inspect
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+import pandas as pd
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+# One cache per server process, shared by every session. Whichever limit is hit first
+# evicts the least recently used results.
+KPI_CACHE_MAX_ENTRIES = 1024
+KPI_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def data_token(value):
+    """
+    Version token of a data argument: the `data_token` attribute of the CFS indexes, or
+    `attrs['data_token']` of a DataFrame. None when the value does not carry one.
+    """
+    if isinstance(value, pd.DataFrame):
+        return value.attrs.get('data_token')
+    return getattr(value, 'data_token', None)
+
+def _scalar_key(value):
+    """Hashable form of a scalar argument (lists become tuples, mappings sorted item tuples); raises TypeError for anything else."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_scalar_key(v) for v in value)
+    if isinstance(value, Mapping):
+        return tuple(sorted((k, _scalar_key(v)) for k, v in value.items()))
+    hash(value)
+    return value
+
+def estimate_bytes(value):
+    """Rough resident size of a cached result."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(k) + estimate_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_bytes(v) for v in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return sys.getsizeof(value) + sum(estimate_bytes(getattr(value, f.name)) for f in dataclasses.fields(value))
+    return sys.getsizeof(value)
+
+
+# =============================================================================
+# LRU CACHE
+# =============================================================================
+class KPICache:
+    """Thread-safe LRU of KPI results, bounded by entry count and by estimated bytes."""
+
+    def __init__(self, max_entries=KPI_CACHE_MAX_ENTRIES, max_bytes=KPI_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        """Returns (True, value) on a hit, (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value):
+        size = estimate_bytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+_kpi_cache = KPICache()
+
+def get_kpi_cache():
+    """The process-wide KPI cache."""
+    return _kpi_cache
+
+
+# =============================================================================
+# DECORATOR
+# =============================================================================
+def call_key(func, data_args):
+    """
+    Returns make_key(args, kwargs) for calls to `func`: (function, data tokens, scalar
+    arguments) as a tuple, or None when the call cannot be cached (see versioned_memo).
+    """
+    signature = inspect.signature(func)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    def make_key(args, kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = [name]
+        for arg, value in bound.arguments.items():
+            if arg in data_args:
+                token = data_token(value)
+                if token is None:
+                    return None
+                key.append((arg, token))
+            else:
+                try:
+                    key.append((arg, _scalar_key(value)))
+                except TypeError:
+                    return None
+        return tuple(key)
+    return make_key
+
+def versioned_memo(*data_args):
+    """
+    Memoizes a pure KPI function in the shared KPICache. The key is (data token, function,
+    scalar arguments): the arguments named in `data_args` (indexes or DataFrames) are never
+    hashed, only their data_token() is, so results are reused by every session until the
+    workbook changes. Calls whose data has no token, or whose other arguments are not
+    hashable, are computed without caching. Cached results are shared: treat them as read-only.
+    """
+    def decorator(func):
+        make_key = call_key(func, data_args)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            if key is None:
+                return func(*args, **kwargs)
+            cache = get_kpi_cache()
+            hit, value = cache.get(key)
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            cache.put(key, value)
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,271 @@
+from dataclasses import dataclass
+from typing import Optional
+import pandas as pd
+
+from .Data_Ingestion import to_rupees
+from .Frozen_Data import freeze_frame
+from .KPI_Cache import versioned_memo
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+CRORE_CONVERSION = 10000000
+# Sanctioned limit per bank, in rupees.
+BANK_LIMITS = {
+    'SBI': 69000000, 'ICICI': 100000000, 'HDFC': 100000000,
+    'Federal': 150000000, 'Axis': 5000000, 'Yes': 50000000
+}
+# Banks whose ledger balance adds to the limit; for the others it is drawn against it.
+POSITIVE_BALANCE_BANKS = ['SBI', 'ICICI', 'HDFC', 'Yes']
+
+
+# =============================================================================
+# RESULT TYPES
+# =============================================================================
+# Results are frozen because memoized ones are shared by every caller.
+@dataclass(frozen=True)
+class BankLimit:
+    """Limit usage of one bank as of a date, in rupees (utilization in %)."""
+    limit: float
+    balance: float
+    used: float
+    available: float
+    utilization: float
+
+@dataclass(frozen=True)
+class CashMetrics:
+    """Ledger inflow, outflow and net flow of a period, in crores."""
+    total_inflow: float
+    total_outflow: float
+    net_flow: float
+
+@dataclass(frozen=True)
+class ActivityFlows:
+    """Net flow of a period per cash flow activity, in crores."""
+    operating: float
+    investing: float
+    financing: float
+
+@dataclass(frozen=True)
+class ForecastMetrics:
+    """Forecast outflow of a period by certainty, in crores."""
+    fixed: float
+    contingency: float
+    total: float
+
+@dataclass(frozen=True)
+class RunwayStatus:
+    """Available limit (rupees) and the fixed-only and fixed + contingency runways (days) as of a date."""
+    balance: float
+    fixed: int
+    total: int
+
+@dataclass(frozen=True)
+class ForecastEfficiency:
+    """Actual vs forecast net flow of a period (crores) and the variance as a % of the actual."""
+    actual_net_flow: float
+    forecast_net_flow: float
+    variance: float
+    efficiency: float
+
+@dataclass(frozen=True)
+class PredictiveInsights:
+    """7-day trend of daily net flow and per-transaction averages of a period, in crores."""
+    trend: str
+    trend_value: float
+    avg_inflow: float
+    avg_outflow: float
+    volatility: float
+
+@dataclass(frozen=True)
+class PeriodKPIs:
+    """Every Overview KPI of one From/To period (see get_period_kpis)."""
+    runway: RunwayStatus
+    revenue: float
+    cash_metrics: CashMetrics
+    flows: ActivityFlows
+    forecast_inflow: float
+    forecast_outflow: ForecastMetrics
+    today_forecast: ForecastMetrics
+    efficiency: ForecastEfficiency
+    ocf_sales_ratio: float
+    predictive: Optional[PredictiveInsights]
+
+
+# =============================================================================
+# LEDGER KPIs
+# =============================================================================
+def consolidate_bank_data(ledger, start_date, end_date):
+    """Transactions of every bank dated start_date..end_date, in date order."""
+    return ledger.between(start_date, end_date)
+
+@versioned_memo('balance_index')
+def get_bank_balances(balance_index, as_of_date, bank_limits=None) -> dict:
+    """{bank: BankLimit} for every bank in `bank_limits` (BANK_LIMITS by default) as of a date."""
+    bank_balances = {}
+    for bank, limit in (bank_limits or BANK_LIMITS).items():
+        balance = balance_index.balance_on(bank, as_of_date)
+        used = -balance if bank in POSITIVE_BALANCE_BANKS else balance
+        available = (limit + balance) if bank in POSITIVE_BALANCE_BANKS else (limit - balance)
+        utilization = (abs(used) / limit * 100) if limit > 0 else 0
+        bank_balances[bank] = BankLimit(limit, balance, used, available, utilization)
+    return bank_balances
+
+def get_available_limit(balance_index, as_of_date, bank_limits=None) -> float:
+    """Total available limit across banks as of a date, in rupees."""
+    return sum(bank.available for bank in get_bank_balances(balance_index, as_of_date, bank_limits).values())
+
+def extract_cash_flows(cube, start_date, end_date) -> ActivityFlows:
+    """Operating, Investing, and Financing cash flows from the daily cube."""
+    flows = cube.by('activity', start_date, end_date)['Net_Flow']
+    return ActivityFlows(*(flows.get(activity, 0) / CRORE_CONVERSION for activity in ('Operating', 'Investing', 'Financing')))
+
+def calculate_cash_metrics(cube, start_date, end_date) -> CashMetrics:
+    totals = cube.totals(start_date, end_date)
+    return CashMetrics(totals['Deposit'] / CRORE_CONVERSION, totals['Withdrawal'] / CRORE_CONVERSION, totals['Net_Flow'] / CRORE_CONVERSION)
+
+def extract_revenue(inflow_sheet, start_date, end_date) -> float:
+    """Revenue billed start_date..end_date from the Inflow sheet, in crores (0 when it cannot be read)."""
+    if inflow_sheet.empty:
+        return 0
+    try:
+        return to_rupees(inflow_sheet[(inflow_sheet['Billing_Date'] >= start_date) & (inflow_sheet['Billing_Date'] <= end_date)]['Amount'].sum()) / CRORE_CONVERSION
+    except Exception:
+        return 0
+
+@versioned_memo('cube')
+def perform_predictive_analysis(cube, start_date, end_date) -> Optional[PredictiveInsights]:
+    """None when the period has fewer than 7 transactions."""
+    totals = cube.totals(start_date, end_date)
+    if totals['Count'] < 7:
+        return None
+    daily = cube.daily(start_date, end_date)
+    daily_flow = daily.loc[daily['Count'] > 0, 'Net_Flow']
+    ma_7 = daily_flow.rolling(window=7, min_periods=1).mean()
+    current_trend = ma_7.iloc[-1] - ma_7.iloc[-7] if len(ma_7) >= 7 else 0
+    return PredictiveInsights(
+        trend='Increasing' if current_trend > 0 else 'Decreasing',
+        trend_value=current_trend / CRORE_CONVERSION,
+        avg_inflow=(totals['Deposit'] / totals['Deposit_Count'] if totals['Deposit_Count'] else float('nan')) / CRORE_CONVERSION,
+        avg_outflow=(totals['Withdrawal'] / totals['Withdrawal_Count'] if totals['Withdrawal_Count'] else float('nan')) / CRORE_CONVERSION,
+        volatility=daily_flow.std() / CRORE_CONVERSION if len(daily_flow) > 1 else 0,
+    )
+
+
+# =============================================================================
+# FORECAST KPIs
+# =============================================================================
+@versioned_memo('forecast_index')
+def get_forecast_metrics(forecast_index, start_date, end_date) -> ForecastMetrics:
+    """Forecast outflow dated start_date..end_date."""
+    totals = forecast_index.outflow_totals(start_date, end_date)
+    return ForecastMetrics(**{key: value / CRORE_CONVERSION for key, value in totals.items()})
+
+@versioned_memo('forecast_index')
+def get_forecast_inflow(forecast_index, start_date, end_date) -> float:
+    """Forecast inflow dated start_date..end_date, in crores."""
+    return forecast_index.inflow_total(start_date, end_date) / CRORE_CONVERSION
+
+@versioned_memo('forecast_index')
+def calculate_cash_runway(total_balance_available, forecast_index, as_of_date, certainty_levels) -> int:
+    """
+    Calculates how many days until available limit reaches zero based on future forecasted outflows.
+    """
+    return forecast_index.runway_days(total_balance_available, as_of_date, certainty_levels)
+
+def get_runway_status(dataset, end_date) -> RunwayStatus:
+    """Available limit and both runways as of end_date."""
+    total_balance_available = get_available_limit(dataset.balances, end_date, dataset.bank_limits)
+    return RunwayStatus(
+        balance=total_balance_available,
+        fixed=calculate_cash_runway(total_balance_available, dataset.forecasts, end_date, certainty_levels=['fixed']),
+        total=calculate_cash_runway(total_balance_available, dataset.forecasts, end_date, certainty_levels=['fixed', 'contingency']),
+    )
+
+@versioned_memo('balance_index', 'forecast_index')
+def get_runway_history(balance_index, forecast_index, start_date, end_date, bank_limits=None) -> pd.DataFrame:
+    """
+    Available limit (rupees) and the fixed-only and fixed + contingency runways (days) as of
+    every calendar day start_date..end_date, indexed by date. The limits of all days come from
+    one vectorized balance lookup and each runway from one batch search, instead of one
+    get_runway_status per day. Read-only.
+    """
+    bank_limits = bank_limits or BANK_LIMITS
+    dates = pd.date_range(pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize(), freq='D')
+    balances = balance_index.balances(dates, banks=list(bank_limits))
+    available = sum(
+        (limit + balances[bank]) if bank in POSITIVE_BALANCE_BANKS else (limit - balances[bank])
+        for bank, limit in bank_limits.items()
+    )
+    return freeze_frame(pd.DataFrame({
+        'Available_Limit': available.to_numpy(dtype='float64'),
+        'Fixed': forecast_index.runway_days_many(available, dates, ['fixed']),
+        'Total': forecast_index.runway_days_many(available, dates, ['fixed', 'contingency']),
+    }, index=dates))
+
+def get_forecast_efficiency(dataset, start_date, end_date) -> ForecastEfficiency:
+    """How far the period's actual net flow landed from its forecast net flow."""
+    actual_net_flow = calculate_cash_metrics(dataset.cube, start_date, end_date).net_flow
+    forecast_net_flow = get_forecast_inflow(dataset.forecasts, start_date, end_date) - get_forecast_metrics(dataset.forecasts, start_date, end_date).total
+    variance = actual_net_flow - forecast_net_flow
+    if actual_net_flow != 0:
+        efficiency = (variance / abs(actual_net_flow)) * 100
+    else:
+        efficiency = 999.0 if abs(variance) > 0.01 else 0.0
+    return ForecastEfficiency(actual_net_flow, forecast_net_flow, variance, efficiency)
+
+def get_ocf_sales_ratio(dataset, start_date, end_date) -> float:
+    """Operating cash flow / revenue of the period (0 without revenue)."""
+    revenue = extract_revenue(dataset.inflow_sheet, start_date, end_date)
+    return extract_cash_flows(dataset.cube, start_date, end_date).operating / revenue if revenue != 0 else 0
+
+
+# =============================================================================
+# PERIOD KPIs
+# =============================================================================
+def get_period_kpis(dataset, start_date, end_date) -> PeriodKPIs:
+    """The Overview KPIs of start_date..end_date, computed from the indexes."""
+    return PeriodKPIs(
+        runway=get_runway_status(dataset, end_date),
+        revenue=extract_revenue(dataset.inflow_sheet, start_date, end_date),
+        cash_metrics=calculate_cash_metrics(dataset.cube, start_date, end_date),
+        flows=extract_cash_flows(dataset.cube, start_date, end_date),
+        forecast_inflow=get_forecast_inflow(dataset.forecasts, start_date, end_date),
+        forecast_outflow=get_forecast_metrics(dataset.forecasts, start_date, end_date),
+        today_forecast=get_forecast_metrics(dataset.forecasts, end_date, end_date),
+        efficiency=get_forecast_efficiency(dataset, start_date, end_date),
+        ocf_sales_ratio=get_ocf_sales_ratio(dataset, start_date, end_date),
+        predictive=perform_predictive_analysis(dataset.cube, start_date, end_date),
+    )
+
+
+# =============================================================================
+# KPI TABLE
+# =============================================================================
+def get_kpi_table(dataset, start_date, end_date, kpis=None) -> pd.DataFrame:
+    """
+    The Overview KPIs of the period as (Section, KPI, Value, Unit) rows; amounts are in crores.
+    `kpis` are the period's PeriodKPIs when the caller already has them.
+    """
+    kpis = kpis or get_period_kpis(dataset, start_date, end_date)
+    ccc = dataset.ccc['CCC'] if dataset.ccc else None
+    rows = [
+        ('Key Financial Metrics', 'Available Limit', kpis.runway.balance / CRORE_CONVERSION, 'Cr'),
+        ('Key Financial Metrics', 'Cash Runway (Fixed Outflow)', kpis.runway.fixed, 'days'),
+        ('Key Financial Metrics', 'Cash Runway (Total Outflow)', kpis.runway.total, 'days'),
+        ('Key Financial Metrics', 'Revenue', kpis.revenue, 'Cr'),
+        ('Key Financial Metrics', 'Cash Conversion Cycle', ccc, 'days'),
+        ('Cash Flow Activities', 'Operating Activity', kpis.flows.operating, 'Cr'),
+        ('Cash Flow Activities', 'Investing Activity', kpis.flows.investing, 'Cr'),
+        ('Cash Flow Activities', 'Financing Activity', kpis.flows.financing, 'Cr'),
+        ('Cash Flow Activities', 'Total Inflow', kpis.cash_metrics.total_inflow, 'Cr'),
+        ('Cash Flow Activities', 'Total Outflow', kpis.cash_metrics.total_outflow, 'Cr'),
+        ('Cash Flow Activities', 'Net Flow (Period)', kpis.cash_metrics.net_flow, 'Cr'),
+        ('Forecast (Period)', 'Forecasted Inflow', kpis.forecast_inflow, 'Cr'),
+        ('Forecast (Period)', 'Forecasted Outflow (Fixed)', kpis.forecast_outflow.fixed, 'Cr'),
+        ('Forecast (Period)', 'Forecasted Outflow (Contingency)', kpis.forecast_outflow.contingency, 'Cr'),
+        ('Forecast (Period)', 'Forecasted Outflow', kpis.forecast_outflow.total, 'Cr'),
+    ]
+    table = pd.DataFrame(rows, columns=['Section', 'KPI', 'Value', 'Unit'])
+    table['Value'] = pd.to_numeric(table['Value'], errors='coerce').astype('float64')
+    return table
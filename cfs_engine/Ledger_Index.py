@@ -0,0 +1,310 @@
+import numpy as np
+import pandas as pd
+
+from .Frozen_Data import freeze_array, freeze_arrays, freeze_frame, freeze_mapping
+
+# Ledger amounts arrive as int64 paise (see Data_Ingestion.compact_frame); indexes sum them
+# exactly as integers and hand out rupees.
+PAISE_PER_RUPEE = 100
+
+
+def concat_keeping_categories(frames):
+    """pd.concat that keeps categorical columns categorical when the frames' categories differ."""
+    combined = pd.concat(frames, ignore_index=True)
+    for name in frames[0].columns:
+        if isinstance(frames[0][name].dtype, pd.CategoricalDtype) and not isinstance(combined[name].dtype, pd.CategoricalDtype):
+            combined[name] = combined[name].astype('category')
+    return combined
+
+
+# =============================================================================
+# CONSOLIDATED LEDGER
+# =============================================================================
+class ConsolidatedLedger:
+    """
+    All bank ledgers concatenated once per data version.
+
+    `frame` is sorted by Value_Date (stable, so same-day rows keep their sheet order)
+    and date ranges are cut from it with binary search, returning slices instead of
+    filtered copies. `by_bank` holds the same rows grouped by bank, with `bank_offsets`
+    giving each bank's [start, stop) rows so single-bank views never scan other banks.
+    `data_token` identifies the data version the ledger was built from (see KPI_Cache).
+    Row `i` of bank_data[bank] sits at frame row `frame_positions[source_offsets[bank] + i]`.
+    """
+
+    def __init__(self, bank_data, data_token=None):
+        self.data_token = data_token
+        frames = [df.assign(Bank=bank) for bank, df in bank_data.items() if not df.empty]
+        if frames:
+            combined = concat_keeping_categories(frames)
+        else:
+            combined = pd.DataFrame({'Value_Date': pd.Series(dtype='datetime64[s]'), 'Net_Flow': pd.Series(dtype='int64'), 'Bank': pd.Series(dtype='category')})
+
+        order = np.argsort(combined['Value_Date'].to_numpy(), kind='stable')
+        self.frame = combined.iloc[order].reset_index(drop=True)
+        self.dates = pd.DatetimeIndex(self.frame['Value_Date'])
+        self.frame_positions = np.empty(len(order), dtype='int64')
+        self.frame_positions[order] = np.arange(len(order))
+        self.source_offsets, start = {}, 0
+        for bank, df in bank_data.items():
+            self.source_offsets[bank] = start
+            start += len(df)
+
+        # Bank blocks keep the original bank order; rows inside a block are date sorted.
+        bank_order = {bank: i for i, bank in enumerate(bank_data)}
+        self.by_bank = self.frame.iloc[self.frame['Bank'].map(bank_order).astype('int64').argsort(kind='stable')].reset_index(drop=True)
+        counts = self.frame['Bank'].value_counts()
+        self.bank_offsets, start = {}, 0
+        for bank in bank_data:
+            stop = start + int(counts.get(bank, 0))
+            self.bank_offsets[bank] = (start, stop)
+            start = stop
+        self.bank_dates = {bank: pd.DatetimeIndex(self.by_bank['Value_Date'].iloc[lo:hi]) for bank, (lo, hi) in self.bank_offsets.items()}
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    def date_bounds(self):
+        """(min_date, max_date) as `date` objects, or (None, None) when there are no transactions."""
+        if self.empty:
+            return None, None
+        return self.dates[0].date(), self.dates[-1].date()
+
+    def _positions(self, dates, start_date, end_date):
+        lo = dates.searchsorted(pd.Timestamp(start_date), side='left') if start_date is not None else 0
+        hi = dates.searchsorted(pd.Timestamp(end_date), side='right') if end_date is not None else len(dates)
+        return lo, max(lo, hi)
+
+    def between(self, start_date=None, end_date=None):
+        """Transactions with start_date <= Value_Date <= end_date across all banks, in date order."""
+        lo, hi = self._positions(self.dates, start_date, end_date)
+        return self.frame.iloc[lo:hi]
+
+    def bank_between(self, bank, start_date=None, end_date=None):
+        """Same as `between` for a single bank, cut from that bank's own block."""
+        if bank not in self.bank_offsets:
+            return self.by_bank.iloc[0:0]
+        base, _ = self.bank_offsets[bank]
+        lo, hi = self._positions(self.bank_dates[bank], start_date, end_date)
+        return self.by_bank.iloc[base + lo:base + hi]
+
+    def freeze(self):
+        """Makes the ledger read-only so it can be shared between sessions."""
+        self.frame, self.by_bank = freeze_frame(self.frame), freeze_frame(self.by_bank)
+        self.bank_offsets = freeze_mapping(self.bank_offsets, tuple)
+        self.bank_dates = freeze_mapping(self.bank_dates, pd.DatetimeIndex)
+        self.source_offsets = freeze_mapping(self.source_offsets, int)
+        freeze_array(self.frame_positions)
+        return self
+
+
+# =============================================================================
+# AS-OF BALANCE INDEX
+# =============================================================================
+class BalanceIndex:
+    """
+    Running_Balance of each bank "as of" any date, answered by binary search over the
+    bank's sorted Value_Dates. The balance on D is the last one recorded on or before D
+    (sheet order breaks same-day ties), so rows with a blank balance are skipped rather
+    than read as 0; before the first recorded balance it is 0.
+
+    Built from each bank's balance rows (see Data_Ingestion.split_bank_rows), which also
+    hold the dated rows without a Net_Flow that the ledger leaves out.
+    """
+
+    def __init__(self, bank_balances, data_token=None):
+        self.data_token = data_token
+        self.banks = list(bank_balances)
+        self._dates, self._balances = {}, {}
+        for bank, df in bank_balances.items():
+            known = df[df['Running_Balance'].notna()]
+            order = np.argsort(known['Value_Date'].to_numpy(), kind='stable')
+            self._dates[bank] = pd.DatetimeIndex(known['Value_Date'].to_numpy()[order])
+            self._balances[bank] = known['Running_Balance'].to_numpy(dtype='int64')[order]
+
+    def balance_on(self, bank, as_of_date):
+        """Balance of one bank on one date."""
+        dates = self._dates.get(bank)
+        if dates is None or len(dates) == 0:
+            return 0
+        pos = dates.searchsorted(pd.Timestamp(as_of_date), side='right') - 1
+        return self._balances[bank][pos] / PAISE_PER_RUPEE if pos >= 0 else 0
+
+    @classmethod
+    def combine(cls, indexes, data_token=None):
+        """
+        Index of several ledgers together (e.g. one per entity): each bank's balance on any
+        date is the sum of the indexes' as-of balances, so no ledger rows are needed.
+        """
+        combined = cls.__new__(cls)
+        combined.data_token = data_token
+        combined.banks = list(dict.fromkeys(bank for index in indexes for bank in index.banks))
+        combined._dates, combined._balances = {}, {}
+        for bank in combined.banks:
+            parts = [(index._dates[bank], index._balances[bank]) for index in indexes if len(index._dates.get(bank, ()))]
+            dates = pd.DatetimeIndex([]).append([part_dates for part_dates, _ in parts]).unique().sort_values()
+            balances = np.zeros(len(dates), dtype='int64')
+            for part_dates, part_balances in parts:
+                pos = part_dates.searchsorted(dates, side='right') - 1
+                balances += np.where(pos >= 0, part_balances[np.maximum(pos, 0)], 0)
+            combined._dates[bank], combined._balances[bank] = dates, balances
+        return combined
+
+    def balances_on(self, as_of_date):
+        """{bank: balance} for every bank on one date."""
+        return {bank: self.balance_on(bank, as_of_date) for bank in self.banks}
+
+    def balances(self, dates, banks=None):
+        """Balances for many dates and banks in one vectorized pass: a DataFrame indexed by date with one column per bank."""
+        dates = pd.DatetimeIndex(dates)
+        columns = {}
+        for bank in banks or self.banks:
+            bank_dates = self._dates.get(bank)
+            if bank_dates is None or len(bank_dates) == 0:
+                columns[bank] = np.zeros(len(dates))
+                continue
+            pos = bank_dates.searchsorted(dates, side='right') - 1
+            columns[bank] = np.where(pos >= 0, self._balances[bank][np.maximum(pos, 0)], 0) / PAISE_PER_RUPEE
+        return pd.DataFrame(columns, index=dates)
+
+    def freeze(self):
+        """Makes the index read-only so it can be shared between sessions."""
+        self._dates = freeze_mapping(self._dates, pd.DatetimeIndex)
+        self._balances = freeze_mapping(self._balances, freeze_array)
+        return self
+
+
+# =============================================================================
+# DAILY AGGREGATE CUBE
+# =============================================================================
+class DailyCube:
+    """
+    Ledger totals per calendar day x (bank, activity, category) with prefix sums over days,
+    so the total for any From/To range is two lookups and a subtraction.
+
+    Measures: Deposit, Withdrawal and Net_Flow sums, plus the number of transactions
+    (Count) and of positive / negative ones (Deposit_Count / Withdrawal_Count), which
+    the averages in the predictive insights need. Filters are passed as bank=, activity=
+    or category= with a single value or a list.
+    """
+
+    MEASURES = ['Deposit', 'Withdrawal', 'Net_Flow', 'Count', 'Deposit_Count', 'Withdrawal_Count']
+    DIMENSIONS = {'bank': 'Bank', 'activity': 'Activity', 'category': 'Category'}
+
+    def __init__(self, ledger):
+        self.data_token = ledger.data_token
+        frame = ledger.frame
+        keys = list(self.DIMENSIONS.values())
+        if frame.empty or not set(keys).issubset(frame.columns):
+            self.day0, self.days = None, pd.DatetimeIndex([])
+            self.groups = pd.DataFrame(columns=keys)
+            self._daily = np.zeros((0, 0, len(self.MEASURES)), dtype='int64')
+        else:
+            day = frame['Value_Date'].dt.normalize()
+            self.day0 = day.iloc[0]
+            self.days = pd.date_range(self.day0, day.iloc[-1], freq='D')
+            grouped = frame.groupby(keys, sort=False, observed=True)
+            codes = grouped.ngroup().to_numpy()
+            self.groups = grouped.size().index.to_frame(index=False)
+
+            net = frame['Net_Flow'].to_numpy(dtype='int64')
+            values = np.column_stack([
+                frame['Deposit'].to_numpy(dtype='int64'),
+                frame['Withdrawal'].to_numpy(dtype='int64'),
+                net,
+                np.ones(len(frame), dtype='int64'),
+                (net > 0).astype('int64'),
+                (net < 0).astype('int64'),
+            ])
+            self._daily = np.zeros((len(self.days), len(self.groups), len(self.MEASURES)), dtype='int64')
+            np.add.at(self._daily, ((day - self.day0).dt.days.to_numpy(), codes), values)
+        self._build_prefix()
+
+    def _build_prefix(self):
+        # Everything is summed in exact integers (paise and counts); _scale turns results into rupees.
+        self._prefix = np.concatenate([np.zeros((1,) + self._daily.shape[1:], dtype='int64'), np.cumsum(self._daily, axis=0)])
+        self._total_prefix = self._prefix.sum(axis=1)
+        self._scale = np.array([1 / PAISE_PER_RUPEE] * 3 + [1] * 3)
+
+    @classmethod
+    def combine(cls, cubes, data_token=None):
+        """
+        Cube of several ledgers together (e.g. one per entity), built by summing the cubes'
+        daily totals over the union of their days and groups; no ledger rows are needed.
+        """
+        combined = cls.__new__(cls)
+        combined.data_token = data_token
+        keys = list(cls.DIMENSIONS.values())
+        cubes = [cube for cube in cubes if len(cube.days)]
+        if not cubes:
+            combined.day0, combined.days = None, pd.DatetimeIndex([])
+            combined.groups = pd.DataFrame(columns=keys)
+            combined._daily = np.zeros((0, 0, len(cls.MEASURES)), dtype='int64')
+        else:
+            combined.day0 = min(cube.day0 for cube in cubes)
+            combined.days = pd.date_range(combined.day0, max(cube.days[-1] for cube in cubes), freq='D')
+            groups = pd.concat([cube.groups[keys].astype(object) for cube in cubes], ignore_index=True)
+            combined.groups = groups.drop_duplicates().reset_index(drop=True)
+            group_index = pd.MultiIndex.from_frame(combined.groups)
+            combined._daily = np.zeros((len(combined.days), len(combined.groups), len(cls.MEASURES)), dtype='int64')
+            for cube in cubes:
+                lo = (cube.day0 - combined.day0).days
+                columns = group_index.get_indexer(pd.MultiIndex.from_frame(cube.groups[keys].astype(object)))
+                combined._daily[lo:lo + len(cube.days)][:, columns] += cube._daily
+        combined._build_prefix()
+        return combined
+
+    def _day_bounds(self, start_date, end_date):
+        """[lo, hi) day rows covering start_date..end_date (inclusive)."""
+        n = len(self.days)
+        if n == 0:
+            return 0, 0
+        lo = 0 if start_date is None else min(max((pd.Timestamp(start_date).normalize() - self.day0).days, 0), n)
+        hi = n if end_date is None else min(max((pd.Timestamp(end_date).normalize() - self.day0).days + 1, 0), n)
+        return lo, max(lo, hi)
+
+    def _group_mask(self, filters):
+        mask = np.ones(len(self.groups), dtype=bool)
+        for name, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= self.groups[self.DIMENSIONS[name]].isin(values).to_numpy()
+        return mask
+
+    def totals(self, start_date=None, end_date=None, **filters):
+        """Range totals of every measure as a Series."""
+        lo, hi = self._day_bounds(start_date, end_date)
+        if filters:
+            mask = self._group_mask(filters)
+            values = (self._prefix[hi, mask] - self._prefix[lo, mask]).sum(axis=0)
+        else:
+            values = self._total_prefix[hi] - self._total_prefix[lo]
+        return pd.Series(values * self._scale, index=self.MEASURES)
+
+    def by(self, dimension, start_date=None, end_date=None, **filters):
+        """Range totals split by one dimension ('bank', 'activity' or 'category')."""
+        lo, hi = self._day_bounds(start_date, end_date)
+        mask = self._group_mask(filters)
+        values = pd.DataFrame((self._prefix[hi, mask] - self._prefix[lo, mask]) * self._scale, columns=self.MEASURES)
+        return values.groupby(self.groups.loc[mask, self.DIMENSIONS[dimension]].to_numpy()).sum()
+
+    def daily(self, start_date=None, end_date=None, **filters):
+        """Per-day totals for the range (every calendar day; Count is 0 on days without transactions)."""
+        lo, hi = self._day_bounds(start_date, end_date)
+        values = self._daily[lo:hi][:, self._group_mask(filters)].sum(axis=1) * self._scale
+        return pd.DataFrame(values, index=self.days[lo:hi], columns=self.MEASURES)
+
+    def cumulative(self, start_date=None, end_date=None, **filters):
+        """
+        Running totals from start_date through every day up to end_date: row D equals
+        totals(start_date, D), all computed exactly in one pass over the prefix sums.
+        """
+        lo, hi = self._day_bounds(start_date, end_date)
+        prefix = self._prefix[:, self._group_mask(filters)].sum(axis=1) if filters else self._total_prefix
+        values = (prefix[lo + 1:hi + 1] - prefix[lo]) * self._scale
+        return pd.DataFrame(values, index=self.days[lo:hi], columns=self.MEASURES)
+
+    def freeze(self):
+        """Makes the cube read-only so it can be shared between sessions."""
+        self.groups = freeze_frame(self.groups)
+        return freeze_arrays(self)
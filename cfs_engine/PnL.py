@@ -0,0 +1,126 @@
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+import pandas as pd
+
+from .KPI_Cache import versioned_memo
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+PL_FILE_PATH = r"C:\Users\hp\OneDrive\Desktop\Script\OPL\Base data\OPL FS Consolidate 0725.xlsx"
+PL_SHEET = 'P&L'
+CRORE_CONVERSION = 10000000
+
+PL_ITEMS = [
+    'Revenue', 'Operating expense', 'Admin & Overheads', 'Employee Cost',
+    'Other cost', 'EBITDA', 'Finance Costs', 'PAT'
+]
+COST_ITEMS = ['Operating expense', 'Admin & Overheads', 'Employee Cost', 'Other cost']
+
+
+# =============================================================================
+# RESULT TYPES
+# =============================================================================
+@dataclass(frozen=True)
+class PLData:
+    """
+    `monthly`: {item: {'months': [labels], 'values': [crores]}} for the 12 month columns;
+    `ytd`: {item: YTD crores}. Only items found in the sheet are present.
+    """
+    monthly: dict = field(default_factory=dict)
+    ytd: dict = field(default_factory=dict)
+
+@dataclass(frozen=True)
+class PLRatios:
+    """YTD ratios to revenue, in %."""
+    ebitda_margin: float
+    cost_ratio: float
+    net_margin: float
+
+
+# =============================================================================
+# LOADING & PROCESSING
+# =============================================================================
+def load_pl_sheet(file_path=PL_FILE_PATH):
+    """
+    Reads the P&L sheet with lower-cased column names. `attrs['data_token']` carries the
+    workbook version, so process_pl_data results are shared until it changes.
+    """
+    stat = os.stat(file_path)
+    pl_df = pd.read_excel(file_path, sheet_name=PL_SHEET)
+    pl_df.columns = [str(col).strip().lower() for col in pl_df.columns]
+    pl_df.attrs['data_token'] = f"{file_path}|{stat.st_size}-{stat.st_mtime_ns}"
+    return pl_df
+
+@versioned_memo('pl_df')
+def process_pl_data(pl_df) -> PLData:
+    """
+    Processes the P&L DataFrame to extract monthly and YTD data.
+    Now fetches data from columns C to N (skipping B and O).
+    """
+    if pl_df is None or pl_df.empty:
+        return PLData()
+    statement_col = pl_df.columns[0]
+
+    # Get all columns except the first statement column
+    all_data_cols = pl_df.columns[1:]
+
+    # Filter out YTD columns
+    non_ytd_cols = [col for col in all_data_cols if 'ytd' not in col.lower()]
+
+    # Skip the first month column (index 0, which is column B) and take the next 12 months (C to N)
+    # This gets columns at indices 1-12 from non_ytd_cols, which corresponds to C-N in Excel
+    month_cols = non_ytd_cols[1:13] if len(non_ytd_cols) > 1 else []
+
+    # Get YTD column (column O)
+    ytd_col = next((col for col in pl_df.columns if 'ytd' in col.lower()), None)
+
+    pl_data = {}
+    ytd_data = {}
+
+    for item in PL_ITEMS:
+        matching_rows = pl_df[pl_df[statement_col].astype(str).str.contains(item, case=False, na=False)]
+
+        if not matching_rows.empty:
+            row = matching_rows.iloc[0]
+            monthly_values = [pd.to_numeric(row.get(col, 0), errors='coerce') / CRORE_CONVERSION for col in month_cols]
+            pl_data[item] = {
+                'months': [col.replace('-', ' ').title() for col in month_cols],
+                'values': [v if pd.notna(v) else 0 for v in monthly_values]
+            }
+
+            if ytd_col and ytd_col in row:
+                ytd_val = pd.to_numeric(row[ytd_col], errors='coerce')
+                ytd_data[item] = ytd_val / CRORE_CONVERSION if pd.notna(ytd_val) else 0
+            else:
+                ytd_data[item] = sum(pl_data[item]['values'])
+
+    return PLData(pl_data, ytd_data)
+
+def consolidate_pl_data(pl_datas) -> PLData:
+    """PLData of several entities summed per item and month, e.g. for the consolidated view."""
+    monthly, ytd = {}, {}
+    for pl in pl_datas:
+        for item, series in pl.monthly.items():
+            total = monthly.setdefault(item, {'months': list(series['months']), 'values': [0] * len(series['months'])})
+            if len(series['months']) > len(total['months']):
+                total['months'] = list(series['months'])
+                total['values'] += [0] * (len(series['months']) - len(total['values']))
+            for i, value in enumerate(series['values']):
+                total['values'][i] += value
+        for item, value in pl.ytd.items():
+            ytd[item] = ytd.get(item, 0) + value
+    return PLData(monthly, ytd)
+
+def get_pl_ratios(ytd_data) -> Optional[PLRatios]:
+    """EBITDA margin, cost-to-revenue and net profit margin; None without positive revenue."""
+    revenue = ytd_data.get('Revenue', 0)
+    if not revenue > 0:
+        return None
+    total_costs = sum([abs(ytd_data.get(c, 0)) for c in COST_ITEMS])
+    return PLRatios(
+        ebitda_margin=(ytd_data.get('EBITDA', 0) / revenue) * 100,
+        cost_ratio=(total_costs / revenue) * 100,
+        net_margin=(ytd_data.get('PAT', 0) / revenue) * 100,
+    )
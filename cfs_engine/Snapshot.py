@@ -0,0 +1,221 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import pandas as pd
+
+from .Data_Ingestion import FILE_PATH, SHEET_PARSE_WORKERS, CFSDataset, get_file_version, memory_usage, parse_workbook
+
+# =============================================================================
+# CONFIGURATION VARIABLES
+# =============================================================================
+# Parsed workbooks are stored here as Parquet, one sub-folder per workbook.
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cfs_snapshot')
+# Bump when the normalized columns change so older snapshots are rebuilt.
+SNAPSHOT_FORMAT = 7
+MANIFEST_FILE = 'manifest.json'
+# Each build writes its frames to a new 'data-<ns>' sub-folder that the manifest then points to.
+DATA_FOLDER_PREFIX = 'data-'
+
+
+# =============================================================================
+# SNAPSHOT HELPERS
+# =============================================================================
+def file_content_hash(file_path, chunk_size=1 << 20):
+    """SHA-256 of the workbook bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def snapshot_path(file_path, snapshot_dir=None):
+    """Folder holding the snapshot of `file_path`."""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    path_key = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(snapshot_dir or SNAPSHOT_DIR, f"{stem}-{path_key}")
+
+def read_manifest(folder):
+    """The MANIFEST_FILE of `folder` as a dict, or None when it is missing or unreadable."""
+    try:
+        with open(os.path.join(folder, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(folder, manifest):
+    """Replaces the MANIFEST_FILE of `folder` in one step, so readers see the old or the new one, never a partial file."""
+    # The temporary name is unique per writer, so concurrent writers never share one file.
+    tmp_path = os.path.join(folder, f"{MANIFEST_FILE}.{os.getpid()}-{threading.get_ident()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(folder, MANIFEST_FILE))
+
+def snapshot_is_current(file_path, snapshot_dir=None):
+    """True when the snapshot of `file_path` was built from its current size + mtime, so loading it parses nothing."""
+    manifest = read_manifest(snapshot_path(file_path, snapshot_dir))
+    try:
+        return bool(manifest) and manifest.get('format') == SNAPSHOT_FORMAT and manifest.get('stat_version') == get_file_version(file_path)
+    except OSError:
+        return False
+
+def _frame_files(dataset):
+    """Yields (file name, DataFrame) for every frame stored in the snapshot."""
+    for bank, df in dataset.bank_data.items():
+        yield f"bank_{bank}.parquet", df
+    for bank, df in dataset.bank_balances.items():
+        yield f"balances_{bank}.parquet", df
+    yield 'forecast.parquet', dataset.forecast_data
+    yield 'inflow_forecast.parquet', dataset.inflow_forecast_data
+    yield 'inflow.parquet', dataset.inflow_sheet
+
+# Snapshot folder -> lock held while it is loaded or rebuilt in this process (see load_or_build_snapshot).
+_folder_locks = {}
+_folder_locks_guard = threading.Lock()
+
+def _folder_lock(folder):
+    with _folder_locks_guard:
+        return _folder_locks.setdefault(folder, threading.Lock())
+
+def _remove_old_data(folder, keep):
+    """
+    Deletes the data sub-folders older than every one in `keep`. The previous build is kept
+    for readers still reading it, and newer ones may belong to a build still being written.
+    """
+    oldest = min(keep)
+    for name in os.listdir(folder):
+        if name.startswith(DATA_FOLDER_PREFIX) and name < oldest:
+            shutil.rmtree(os.path.join(folder, name), ignore_errors=True)
+
+
+# =============================================================================
+# READ / WRITE
+# =============================================================================
+def write_snapshot(dataset, stat_version, content_hash, snapshot_dir=None):
+    """
+    Writes every frame of `dataset` to Parquet in a new data sub-folder, then swaps in a manifest
+    pointing to it. Files a manifest refers to are never rewritten, so readers never see a
+    partial snapshot, even while another thread or process is writing one.
+    """
+    folder = snapshot_path(dataset.file_path, snapshot_dir)
+    data = f"{DATA_FOLDER_PREFIX}{time.time_ns():020d}-{os.getpid()}"
+    os.makedirs(os.path.join(folder, data))
+    for name, df in _frame_files(dataset):
+        df.reset_index(drop=True).to_parquet(os.path.join(folder, data, name), index=False)
+    previous = read_manifest(folder) or {}
+    write_manifest(folder, {
+        'format': SNAPSHOT_FORMAT,
+        'data': data,
+        'source': os.path.abspath(dataset.file_path),
+        'stat_version': stat_version,
+        'content_hash': content_hash,
+        'banks': list(dataset.bank_data),
+        'ccc': {k: float(v) for k, v in dataset.ccc.items()} if dataset.ccc else None,
+        'resolved_columns': dataset.resolved_columns,
+        'ingest_state': dataset.ingest_state,
+        'parse_seconds': dataset.parse_seconds,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    _remove_old_data(folder, keep=[data] + ([previous['data']] if previous.get('data') else []))
+    return folder
+
+def read_snapshot(folder, manifest, file_path):
+    """Rebuilds a CFSDataset from a snapshot folder."""
+    folder = os.path.join(folder, manifest['data'])
+    dataset = CFSDataset(file_path=file_path, version=manifest['stat_version'], ccc=manifest['ccc'], resolved_columns=manifest['resolved_columns'], ingest_state=manifest['ingest_state'], parse_seconds=manifest.get('parse_seconds', {}))
+    for bank in manifest['banks']:
+        dataset.bank_data[bank] = pd.read_parquet(os.path.join(folder, f"bank_{bank}.parquet"))
+        dataset.bank_balances[bank] = pd.read_parquet(os.path.join(folder, f"balances_{bank}.parquet"))
+    dataset.forecast_data = pd.read_parquet(os.path.join(folder, 'forecast.parquet'))
+    dataset.inflow_forecast_data = pd.read_parquet(os.path.join(folder, 'inflow_forecast.parquet'))
+    dataset.inflow_sheet = pd.read_parquet(os.path.join(folder, 'inflow.parquet'))
+    return dataset
+
+def load_or_build_snapshot(file_path=FILE_PATH, snapshot_dir=None, force=False, workers=SHEET_PARSE_WORKERS):
+    """
+    Returns the dataset for `file_path` from its snapshot when the workbook is unchanged.
+    Size + mtime is checked first; if only the mtime moved, the content hash decides.
+    Falls back to parsing Excel (and refreshing the snapshot) when the source has changed;
+    bank sheets are then ingested incrementally from the previous snapshot. `force` re-parses everything;
+    `workers` is passed to parse_workbook. Calls for the same workbook in this process (the file watcher
+    and dashboard sessions) run one at a time, so a change is parsed once and then read by the others.
+    """
+    folder = snapshot_path(file_path, snapshot_dir)
+    with _folder_lock(folder):
+        return _load_or_build(file_path, snapshot_dir, folder, force, workers)
+
+def _load_or_build(file_path, snapshot_dir, folder, force, workers):
+    stat_version = get_file_version(file_path)
+    manifest = None if force else read_manifest(folder)
+    content_hash = None
+
+    previous = None
+    if manifest and manifest.get('format') == SNAPSHOT_FORMAT:
+        try:
+            if manifest['stat_version'] == stat_version:
+                return read_snapshot(folder, manifest, file_path)
+            content_hash = file_content_hash(file_path)
+            if manifest['content_hash'] == content_hash:
+                manifest['stat_version'] = stat_version
+                write_manifest(folder, manifest)
+                return read_snapshot(folder, manifest, file_path)
+            # The workbook changed: keep the old ledgers so bank sheets only parse their new rows.
+            previous = read_snapshot(folder, manifest, file_path)
+        except Exception:
+            previous = None
+
+    dataset = parse_workbook(file_path, previous=previous, workers=workers)
+    try:
+        write_snapshot(dataset, stat_version, content_hash or file_content_hash(file_path), snapshot_dir)
+    except Exception:
+        # A missing Parquet engine or a read-only folder should not stop the dashboard.
+        pass
+    return dataset
+
+
+# =============================================================================
+# COMMAND LINE
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-build the Parquet snapshot of the CFS workbook.")
+    parser.add_argument('--file', default=FILE_PATH, help="Workbook to snapshot (default: Data_Ingestion.FILE_PATH)")
+    parser.add_argument('--snapshot-dir', default=None, help=f"Snapshot folder (default: {SNAPSHOT_DIR})")
+    parser.add_argument('--force', action='store_true', help="Fully re-parse Excel even if the snapshot is current")
+    parser.add_argument('--workers', type=int, default=SHEET_PARSE_WORKERS, help=f"Worker processes parsing sheets in parallel, 0 for one per CPU (default: {SHEET_PARSE_WORKERS})")
+    parser.add_argument('--memory', action='store_true', help="Print the in-memory size of every column")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    dataset = load_or_build_snapshot(args.file, args.snapshot_dir, force=args.force, workers=args.workers or None)
+    elapsed = time.perf_counter() - start
+
+    print(f"Snapshot: {snapshot_path(args.file, args.snapshot_dir)}")
+    for name, df in _frame_files(dataset):
+        print(f"  {name:<28} {len(df):>8,} rows")
+    print("Resolved columns:")
+    for sheet, columns in dataset.resolved_columns.items():
+        print(f"  {sheet}: " + ", ".join(f"{name} <- {source!r}" for name, source in columns.items()))
+    print("Bank sheet ingestion:")
+    for sheet, state in dataset.ingest_state.items():
+        print(f"  {sheet}: {state['mode']}, {state['rows']:,} sheet rows")
+    if dataset.parse_seconds:
+        # Against the wall time of a --force run, the sum shows what parallel parsing saved.
+        print("Sheet parse times (last parse):")
+        for sheet, seconds in dataset.parse_seconds.items():
+            print(f"  {sheet:<28} {seconds:>8.3f}s")
+        print(f"  {'Sum':<28} {sum(dataset.parse_seconds.values()):>8.3f}s")
+    if args.memory:
+        usage = memory_usage(dataset)
+        print("Memory per column:")
+        for frame, columns in usage.groupby('Frame', sort=False):
+            print(f"  {frame} ({columns['Bytes'].sum():,} bytes)")
+            for row in columns.itertuples():
+                print(f"    {row.Column:<18} {row.Dtype:<16} {row.Bytes:>10,} bytes")
+        print(f"  Total: {usage['Bytes'].sum():,} bytes")
+    print(f"Done in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
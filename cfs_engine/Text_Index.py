@@ -0,0 +1,137 @@
+import hashlib
+import re
+import numpy as np
+import pandas as pd
+
+from .Frozen_Data import freeze_array
+
+# =============================================================================
+# INVERTED TEXT INDEX
+# =============================================================================
+# Searched fields of each ledger row; their words are indexed together.
+TEXT_COLUMNS = ['Remarks', 'Category']
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lower-cased alphanumeric words of `text`."""
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+def _row_texts(df):
+    """The searched text of every row of a bank ledger, in sheet order."""
+    parts = [df[name].astype(str).to_numpy(dtype=object) for name in TEXT_COLUMNS if name in df.columns]
+    if not parts:
+        return np.full(len(df), '', dtype=object)
+    texts = parts[0]
+    for part in parts[1:]:
+        texts = texts + ' ' + part
+    return texts
+
+def _texts_digest(texts, digest=None):
+    """sha1 of the row texts, continuing `digest` (a prefix's digest) when given."""
+    digest = digest or hashlib.sha1()
+    digest.update(''.join(f"{text}\x1e" for text in texts).encode('utf-8'))
+    return digest
+
+def _build_postings(texts, offset=0):
+    """
+    {token: sorted row numbers} for `texts`, numbered from `offset`. Each distinct text is
+    tokenized once, however many rows repeat it.
+    """
+    codes, uniques = pd.factorize(texts)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    texts_by_token = {}
+    for code, text in enumerate(uniques):
+        for token in set(tokenize(text)):
+            texts_by_token.setdefault(token, []).append(code)
+    return {
+        token: np.sort(np.concatenate([order[bounds[code]:bounds[code + 1]] for code in text_codes])) + offset
+        for token, text_codes in texts_by_token.items()
+    }
+
+
+class TextIndex:
+    """
+    Token -> rows inverted index over the Remarks and Category of every bank ledger.
+
+    Postings are kept per bank in sheet row order, so a newer version of the workbook whose
+    bank sheets only grew at the bottom (see Data_Ingestion.read_sheet_tail) reuses the
+    `previous` postings (an earlier index's reuse_state()) and only tokenizes the appended
+    rows; banks whose indexed rows changed are re-indexed. `build_modes` records what
+    happened to each bank.
+
+    search() matches every query word as a prefix of an indexed word, ANDs the words and
+    cuts the date range by binary search, so a query never scans the ledger.
+    """
+
+    def __init__(self, ledger, bank_data, previous=None):
+        self.data_token = ledger.data_token
+        self._ledger = ledger
+        self._postings, self._indexed, self.build_modes = {}, {}, {}
+        for bank, df in bank_data.items():
+            texts = _row_texts(df)
+            old = previous.get(bank) if previous is not None else None
+            digest = None
+            if old is not None and old['rows'] <= len(texts):
+                digest = _texts_digest(texts[:old['rows']])
+                if digest.hexdigest() != old['digest']:
+                    digest = None
+            if digest is not None:
+                postings = dict(old['postings'])
+                for token, rows in _build_postings(texts[old['rows']:], offset=old['rows']).items():
+                    postings[token] = np.concatenate([postings[token], rows]) if token in postings else rows
+                added = len(texts) - old['rows']
+                self.build_modes[bank] = f"append (+{added} rows)" if added else 'reused'
+                digest = _texts_digest(texts[old['rows']:], digest)
+            else:
+                postings = _build_postings(texts)
+                self.build_modes[bank] = 'full'
+                digest = _texts_digest(texts)
+            self._postings[bank] = postings
+            self._indexed[bank] = {'rows': len(texts), 'digest': digest.hexdigest()}
+        self.vocabulary = np.array(sorted({token for postings in self._postings.values() for token in postings}), dtype=object)
+
+    def _term_positions(self, term):
+        """Sorted ledger.frame rows having a word that starts with `term`."""
+        lo = self.vocabulary.searchsorted(term, side='left')
+        hi = self.vocabulary.searchsorted(term + '\uffff', side='left')
+        tokens = self.vocabulary[lo:hi]
+        found = []
+        for bank, postings in self._postings.items():
+            offset = self._ledger.source_offsets[bank]
+            found += [self._ledger.frame_positions[offset + postings[token]] for token in tokens if token in postings]
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype='int64')
+
+    def search(self, query, start_date=None, end_date=None):
+        """
+        Rows matching every word of `query`, as positions into ledger.between(start_date, end_date)
+        (in date order). A query without words matches every row of the range.
+        """
+        lo, hi = self._ledger._positions(self._ledger.dates, start_date, end_date)
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not terms:
+            return np.arange(hi - lo)
+        positions = None
+        for term in terms:
+            matches = self._term_positions(term)
+            positions = matches if positions is None else np.intersect1d(positions, matches, assume_unique=True)
+            if len(positions) == 0:
+                break
+        return positions[positions.searchsorted(lo):positions.searchsorted(hi)] - lo
+
+    def reuse_state(self):
+        """
+        {bank: rows indexed, fingerprint of their text and postings}: all a later version's index
+        needs to reuse this one. It holds no reference to the ledger, so keeping it does not keep
+        this version's dataset alive.
+        """
+        return {bank: dict(indexed, postings=self._postings[bank]) for bank, indexed in self._indexed.items()}
+
+    def freeze(self):
+        """Makes the index read-only so it can be shared between sessions."""
+        for postings in self._postings.values():
+            for rows in postings.values():
+                freeze_array(rows)
+        freeze_array(self.vocabulary)
+        return self
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+from .Data_Ingestion import to_rupees
+from .KPIs import CRORE_CONVERSION
+
+# =============================================================================
+# TRANSACTION SELECTION
+# =============================================================================
+# Filters, sorting and totals work on row positions into a ledger slice (see
+# ConsolidatedLedger.between), so no filtered copies of the rows are made.
+SORT_COLUMNS = {'Date': 'Value_Date', 'Bank': 'Bank', 'Category': 'Category', 'Amount': 'Net_Flow'}
+SIGN_FILTERS = ['All', 'Inflows', 'Outflows']
+
+
+@dataclass(frozen=True)
+class TransactionSummary:
+    """Number of selected transactions and their inflow, outflow and net flow, in crores."""
+    count: int
+    inflow: float
+    outflow: float
+    net_flow: float
+
+
+def filter_transactions(transactions, banks=None, categories=None, min_amount=None, max_amount=None, sign='All', rows=None):
+    """
+    Row positions of `transactions` that pass the filters. Amount bounds are in crores and
+    apply to the absolute Net_Flow; `sign` keeps only inflows or outflows; `rows`, when given,
+    are the only positions allowed (e.g. the matches of a text search).
+    """
+    mask = np.ones(len(transactions), dtype=bool)
+    if rows is not None:
+        allowed = np.zeros(len(transactions), dtype=bool)
+        allowed[rows] = True
+        mask &= allowed
+    if banks:
+        mask &= transactions['Bank'].isin(banks).to_numpy()
+    if categories:
+        mask &= transactions['Category'].isin(categories).to_numpy()
+    net_flow = transactions['Net_Flow'].to_numpy()
+    amount = np.abs(to_rupees(net_flow)) / CRORE_CONVERSION
+    if min_amount is not None:
+        mask &= amount >= min_amount
+    if max_amount is not None:
+        mask &= amount <= max_amount
+    if sign == 'Inflows':
+        mask &= net_flow > 0
+    elif sign == 'Outflows':
+        mask &= net_flow < 0
+    return np.flatnonzero(mask)
+
+def sort_positions(transactions, positions, column, descending=False):
+    """
+    Orders the filtered positions by one column. The sort is stable either way, so equal values
+    keep date order, and missing values come last either way.
+    """
+    values = transactions[column].iloc[positions]
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        numbers = values.to_numpy()
+        order = np.argsort(-numbers if descending else numbers, kind='stable')
+    else:
+        # Labels sort by their text, not by category code.
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        order = values.reset_index(drop=True).sort_values(ascending=not descending, kind='stable', na_position='last').index.to_numpy()
+    return positions[order]
+
+def summarize_transactions(transactions, positions) -> TransactionSummary:
+    """Count and Cr totals of the filtered rows."""
+    net_flow = to_rupees(transactions['Net_Flow'].to_numpy()[positions]) / CRORE_CONVERSION
+    return TransactionSummary(
+        count=len(positions),
+        inflow=net_flow[net_flow > 0].sum(),
+        outflow=abs(net_flow[net_flow < 0].sum()),
+        net_flow=net_flow.sum(),
+    )
@@ -0,0 +1,66 @@
+import os
+import pickle
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# =============================================================================
+# PROCESS POOL
+# =============================================================================
+# Workers are fresh interpreters started on worker_main() below, never forks of the
+# multi-threaded Streamlit server (Windows cannot fork at all). They are not started
+# through multiprocessing either: its 'spawn' workers first re-run the parent's
+# __main__ script, which under Streamlit is the whole dashboard.
+WORKER_COMMAND = "from cfs_engine.Worker_Pool import worker_main; worker_main()"
+
+
+def worker_count(max_workers, jobs):
+    """Processes to start for `jobs` jobs: `max_workers` (None = one per CPU), never more than the jobs."""
+    return max(1, min(max_workers or os.cpu_count() or 1, jobs))
+
+def worker_main():
+    """
+    Entry point of a worker process: reads a pickled (func, [args, ...]) from stdin, runs
+    func(*args) for each in order and writes the pickled [(ok, result or exception), ...] to stdout.
+    """
+    out = sys.stdout.buffer
+    # Anything the jobs print goes to stderr, so it cannot corrupt the results.
+    sys.stdout = sys.stderr
+    func, jobs = pickle.load(sys.stdin.buffer)
+    outcomes = []
+    for args in jobs:
+        try:
+            outcomes.append((True, func(*args)))
+        except Exception as e:
+            outcomes.append((False, e))
+    pickle.dump(outcomes, out)
+    out.flush()
+
+def _run_worker(func, jobs):
+    """Runs `jobs` one after another in a new worker process; returns their (ok, value) outcomes."""
+    # The worker imports func's module the way this process does.
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path or os.getcwd() for path in sys.path))
+    done = subprocess.run([sys.executable, '-c', WORKER_COMMAND], input=pickle.dumps((func, jobs)), capture_output=True, env=env)
+    if done.returncode != 0 or not done.stdout:
+        detail = done.stderr.decode('utf-8', errors='replace').strip()[-2000:]
+        raise RuntimeError(f"Worker process failed with exit code {done.returncode}: {detail}")
+    return pickle.loads(done.stdout)
+
+def map_in_processes(func, jobs, max_workers=None):
+    """
+    [func(*args) for args in jobs] computed in worker processes, in job order. Jobs are dealt
+    round-robin to the workers, each of which runs its share one after another. `func` must be
+    a module-level function and its arguments and result picklable. A job's exception is raised here.
+    """
+    jobs = list(jobs)
+    workers = worker_count(max_workers, len(jobs))
+    shares = [jobs[i::workers] for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(lambda share: _run_worker(func, share), shares))
+    results = []
+    for i in range(len(jobs)):
+        ok, value = outcomes[i % workers][i // workers]
+        if not ok:
+            raise value
+        results.append(value)
+    return results
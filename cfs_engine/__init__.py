@@ -0,0 +1,16 @@
+"""
+Cash flow engine: workbook loading, indexes and KPIs as plain functions with typed results.
+It does not import Streamlit; the CFS and PnL pages are views over it.
+"""
+from .Daily_Close import DailyClose, materialize_daily_close, read_daily_close
+from .Data_Ingestion import FILE_PATH, CFSDataset, load_dataset, to_rupees
+from .Entities import CONSOLIDATED, ENTITIES, ConsolidatedDataset, consolidate, entity_names, load_entities, load_entity
+from .KPI_Cache import get_kpi_cache, versioned_memo
+from .KPIs import (
+    BANK_LIMITS, ActivityFlows, BankLimit, CashMetrics, ForecastEfficiency, ForecastMetrics, PeriodKPIs, PredictiveInsights, RunwayStatus,
+    calculate_cash_metrics, calculate_cash_runway, extract_cash_flows, extract_revenue, get_available_limit,
+    get_bank_balances, get_forecast_efficiency, get_forecast_inflow, get_forecast_metrics, get_kpi_table,
+    get_ocf_sales_ratio, get_period_kpis, get_runway_history, get_runway_status, perform_predictive_analysis,
+)
+from .PnL import PLData, PLRatios, consolidate_pl_data, get_pl_ratios, load_pl_sheet, process_pl_data
+from .Transactions import TransactionSummary, filter_transactions, sort_positions, summarize_transactions